@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['cart'], name='cartitem_active_cart_idx'),
+        ),
+    ]
@@ -36,6 +36,10 @@ class CartItem(BaseModel):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['cart', 'product']
+        indexes = [
+            models.Index(fields=['cart'], condition=models.Q(is_active=True),
+                         name='cartitem_active_cart_idx'),
+        ]
 
     def __str__(self):
         return f"{self.quantity} x {self.product.title}"
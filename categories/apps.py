@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class CategoriesConfig(AppConfig):
     name = 'categories'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from core.checks import shared_cache_check
+
+        # Cached pages live for a day, a per-process copy would go stale that long
+        checks.register(shared_cache_check('CATEGORY_TREE_CACHE_ALIAS', 'categories.W001'),
+                        checks.Tags.caches, deploy=True)
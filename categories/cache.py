@@ -0,0 +1,91 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.settings import api_settings
+
+from core.cache import VersionedCache
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryTreeCache(VersionedCache):
+    """
+    Serialized pages of the unfiltered CategoryListView.
+
+    All pages hang off a single version number. Category saves and deletes
+    and product count changes bump it once their transaction commits, and a
+    background thread then rebuilds the pages for the new version, so readers
+    normally find them warm. The version also serves as the ETag fingerprint.
+    """
+    prefix = 'category-tree'
+    alias_setting = 'CATEGORY_TREE_CACHE_ALIAS'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._warm_pending = False
+        self._executor = None
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'CATEGORY_TREE_CACHE_TIMEOUT', 86400)
+
+    def _data_key(self, version):
+        return f'{self.prefix}:{version}'
+
+    def get(self):
+        """``(version, {'count': ..., 'pages': [[category, ...], ...]})``, built on a miss."""
+        version = self.version()
+        entry = self.cache.get(self._data_key(version))
+        if entry is None:
+            entry = self.build(version)
+        return version, entry
+
+    def build(self, version=None):
+        from .serializers import CategorySerializer
+        from .tree import CategoryTree
+
+        # Read the version first: a bump during the build leaves this entry
+        # under the older key, never stale data under the newer one
+        if version is None:
+            version = self.version()
+        tree = CategoryTree.load()
+        roots = tree.get_roots()
+        page_size = api_settings.PAGE_SIZE or len(roots) or 1
+        pages = [
+            list(CategorySerializer(roots[i:i + page_size], many=True,
+                                    context={'category_tree': tree}).data)
+            for i in range(0, max(len(roots), 1), page_size)
+        ]
+        entry = {'count': len(roots), 'pages': pages}
+        self.cache.set(self._data_key(version), entry, self.timeout)
+        return entry
+
+    def invalidate(self):
+        self.bump()
+        self.schedule_warm()
+
+    def schedule_warm(self):
+        # Bumps arriving while a rebuild is queued share it
+        with self._lock:
+            if self._warm_pending:
+                return
+            self._warm_pending = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='category-tree')
+        self._executor.submit(self._warm)
+
+    def _warm(self):
+        with self._lock:
+            self._warm_pending = False
+        try:
+            self.build()
+        except Exception:
+            logger.exception('Category tree warm-up failed')
+        finally:
+            connection.close()
+
+
+category_tree_cache = CategoryTreeCache()
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from categories.models import Category
+from categories.paths import build_paths
+
+
+class Command(BaseCommand):
+    help = "Kategoriyalarning path maydonini parent bog'lanishlaridan qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Faqat farqlarni ko'rsatish, saqlamaslik")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = list(Category.objects.select_for_update().values_list('id', 'parent_id', 'path'))
+            paths, orphans = build_paths({pk: parent_id for pk, parent_id, _ in rows})
+            changed = [Category(id=pk, path=paths[pk]) for pk, _, path in rows
+                       if pk in paths and paths[pk] != path]
+            if not options['dry_run']:
+                # bulk_update leaves updated_at alone, the public payloads don't change
+                Category.objects.bulk_update(changed, ['path'], batch_size=1000)
+
+        for pk in orphans:
+            self.stderr.write(f"{pk}: parent zanjiri aylana hosil qiladi, path o'zgartirilmadi")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(rows)} ta kategoriya tekshirildi, {len(changed)} ta path "
+            + ("yangilanishi kerak" if options['dry_run'] else "yangilandi")
+        ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from categories.cache import category_tree_cache
+from categories.models import Category
+from categories.paths import subtree_counts
+from products.models import Product
+
+
+def expected_counts(rows):
+    # rows: (id, parent_id, is_active), returns {id: (product_count, subtree_product_count)}
+    direct = dict(Product.objects.filter(is_active=True).order_by()
+                  .values_list('category').annotate(count=Count('id')))
+    totals = subtree_counts({pk: parent_id for pk, parent_id, _ in rows},
+                            {pk: is_active for pk, _, is_active in rows}, direct)
+    return {pk: (direct.get(pk, 0), totals[pk]) for pk, _, _ in rows}
+
+
+class Command(BaseCommand):
+    help = "Kategoriyalardagi mahsulot sonlarini qayta hisoblab, farqlarni tuzatadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Faqat farqlarni ko'rsatish, saqlamaslik")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Product saves update these rows, so they wait until the fix is committed
+            rows = list(Category.objects.select_for_update().values_list(
+                'id', 'parent_id', 'is_active', 'product_count', 'subtree_product_count'))
+            expected = expected_counts([row[:3] for row in rows])
+            changed = []
+            for pk, _, _, product_count, subtree_product_count in rows:
+                if expected[pk] != (product_count, subtree_product_count):
+                    self.stdout.write(f"{pk}: {product_count}/{subtree_product_count} -> "
+                                      f"{expected[pk][0]}/{expected[pk][1]}")
+                    changed.append(Category(id=pk, product_count=expected[pk][0],
+                                            subtree_product_count=expected[pk][1]))
+            if not options['dry_run'] and changed:
+                Category.objects.bulk_update(changed, Category.COUNTER_FIELDS, batch_size=1000)
+                category_tree_cache.invalidate_on_commit()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(rows)} ta kategoriya tekshirildi, {len(changed)} tasida farq "
+            + ("topildi" if options['dry_run'] else "tuzatildi")
+        ))
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+def build_paths(parents):
+    # A copy of categories.paths.build_paths as of this migration: each path
+    # is the 32-character hex ids from the root down, categories stuck in a
+    # parent cycle get none
+    children = {}
+    for pk, parent_id in parents.items():
+        children.setdefault(parent_id if parent_id in parents else None, []).append(pk)
+    paths = {}
+    stack = [(pk, '') for pk in children.get(None, [])]
+    while stack:
+        pk, prefix = stack.pop()
+        paths[pk] = prefix + pk.hex
+        stack.extend((child, paths[pk]) for child in children.get(pk, []))
+    return paths
+
+
+def populate_paths(apps, schema_editor):
+    Category = apps.get_model('categories', 'Category')
+    paths = build_paths(dict(Category.objects.values_list('id', 'parent_id')))
+    Category.objects.bulk_update(
+        [Category(id=pk, path=path) for pk, path in paths.items()], ['path'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=512),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx'),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
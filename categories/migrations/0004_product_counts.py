@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 10:42
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counts(apps, schema_editor):
+    Category = apps.get_model('categories', 'Category')
+    Product = apps.get_model('products', 'Product')
+    rows = list(Category.objects.values_list('id', 'parent_id', 'is_active', 'path'))
+    direct = dict(Product.objects.filter(is_active=True).order_by()
+                  .values_list('category').annotate(count=Count('id')))
+    # A node's total is its own count plus the totals of its active
+    # children. Paths were filled by 0003; walking the longest first
+    # completes every child before its parent
+    has_path = {pk for pk, _, _, path in rows if path}
+    totals = {pk: direct.get(pk, 0) for pk, _, _, _ in rows}
+    for pk, parent_id, is_active, path in sorted(rows, key=lambda row: len(row[3]), reverse=True):
+        if path and is_active and parent_id in has_path:
+            totals[parent_id] += totals[pk]
+    Category.objects.bulk_update(
+        [Category(id=pk, product_count=direct.get(pk, 0), subtree_product_count=totals[pk])
+         for pk, _, _, _ in rows],
+        ['product_count', 'subtree_product_count'], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_path'),
+        ('products', '0004_view_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='subtree_product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
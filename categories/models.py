@@ -1,6 +1,96 @@
-from django.db import models
+from collections import Counter, defaultdict
+
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Concat, Substr
 from django.utils.text import slugify
 from shared.models import BaseModel
+from . import paths
+from .cache import category_tree_cache
+
+
+class CategoryQuerySet(models.QuerySet):
+
+    def subtree(self, category):
+        # The category itself and all of its descendants, one range on the path index
+        lower, upper = paths.subtree_range(category.path)
+        return self.filter(path__gte=lower, path__lt=upper)
+
+    def hidden_ancestor_of(self, path_ref, within=None):
+        # Inactive categories whose subtree contains path_ref; a soft-deleted
+        # category hides its whole branch, like it does in the tree endpoints
+        queryset = self.filter(is_active=False)
+        if within is not None:
+            queryset = queryset.subtree(within)
+        return queryset.annotate(
+            subtree_end=Concat('path', Value(paths.UPPER_BOUND), output_field=models.CharField())
+        ).filter(path__lte=path_ref, subtree_end__gt=path_ref)
+
+    def move_subtree(self, old_path, new_path):
+        # Rewrites the path prefix of every descendant in one UPDATE
+        lower, upper = paths.subtree_range(old_path)
+        return self.filter(path__gt=lower, path__lt=upper).update(
+            path=Concat(Value(new_path), Substr('path', len(old_path) + 1),
+                        output_field=models.CharField())
+        )
+
+    def add_product_counts(self, deltas):
+        # {category_id: change in active products}, applied to the categories
+        # and rolled up their ancestor chains
+        deltas = {pk: delta for pk, delta in deltas.items() if pk is not None and delta}
+        if not deltas:
+            return
+        stored = dict(self.filter(id__in=deltas).values_list('id', 'path'))
+        starts = Counter()
+        for pk, delta in deltas.items():
+            if stored.get(pk):
+                starts[stored[pk]] += delta
+        self.add_subtree_counts(starts, direct=deltas)
+
+    def add_subtree_counts(self, starts, direct=None):
+        # {path: delta} added to the node at path and its ancestors, up to and
+        # including the first inactive one, which keeps its branch to itself.
+        # direct is {category_id: delta} for product_count, written in the same UPDATE
+        chains = {path: paths.ancestor_ids(path) for path, delta in starts.items() if path and delta}
+        ids = {pk for chain in chains.values() for pk in chain} | set(direct or ())
+        if not ids:
+            return
+        # Lock the whole set up front in primary key order, so writers with
+        # overlapping ancestor chains queue up instead of deadlocking
+        active = dict(self.select_for_update().filter(id__in=ids).order_by('pk')
+                      .values_list('id', 'is_active'))
+        totals = Counter()
+        visible = False
+        for path, chain in chains.items():
+            for pk in chain:
+                totals[pk] += starts[path]
+                if not active.get(pk, False):
+                    break
+            else:
+                # Active up to the root, so the change shows in the category tree
+                visible = True
+        self._increment({'product_count': direct or {}, 'subtree_product_count': totals})
+        if visible:
+            category_tree_cache.invalidate_on_commit()
+
+    def _increment(self, changes):
+        # {field: {id: delta}} applied in one UPDATE, each field through a
+        # CASE over its distinct deltas
+        values = {}
+        for field, deltas in changes.items():
+            by_delta = defaultdict(list)
+            for pk, delta in deltas.items():
+                if delta:
+                    by_delta[delta].append(pk)
+            if by_delta:
+                values[field] = F(field) + Case(
+                    *[When(id__in=ids, then=Value(delta)) for delta, ids in by_delta.items()],
+                    default=Value(0),
+                )
+        ids = {pk for deltas in changes.values() for pk, delta in deltas.items() if delta}
+        if ids:
+            self.filter(id__in=ids).update(**values)
+
 
 class Category(BaseModel):
     title = models.CharField(max_length=255)
@@ -8,11 +98,26 @@ class Category(BaseModel):
     parent = models.ForeignKey('self', on_delete=models.SET_NULL,
                              null=True, blank=True, related_name='children')
     is_active = models.BooleanField(default=True)
+    # Ancestor ids down to this one, see categories.paths
+    path = models.CharField(max_length=paths.MAX_LENGTH, blank=True, editable=False)
+    # Active products directly in this category, and in its visible subtree.
+    # Only changed through F() updates, see add_product_counts
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    subtree_product_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CategoryQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('product_count', 'subtree_product_count')
 
     class Meta:
         verbose_name = "Category"
         verbose_name_plural = "Categories"
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['parent', 'title'], condition=models.Q(is_active=True),
+                         name='category_active_parent_idx'),
+            models.Index(fields=['path'], name='category_path_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -25,7 +130,41 @@ class Category(BaseModel):
             while Category.objects.filter(slug=self.slug).exists():
                 self.slug = f"{original_slug}-{counter}"
                 counter += 1
-        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            # Never write back counters that may have moved since this instance was loaded
+            update_fields = [field.name for field in self._meta.concrete_fields
+                             if not field.primary_key and field.name not in self.COUNTER_FIELDS]
+            kwargs['update_fields'] = update_fields
+        if update_fields is not None and not {'parent', 'parent_id', 'is_active'} & set(update_fields):
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            # Read the stored state, the instances may be stale
+            stored = {row[0]: row[1:] for row in Category.objects.select_for_update()
+                      .filter(pk__in=[self.pk, self.parent_id]).order_by('pk')
+                      .values_list('id', 'path', 'parent_id', 'is_active', 'subtree_product_count')}
+            old_path, old_parent_id, was_active, count = stored.get(self.pk, ('', None, False, 0))
+            parent_path = stored[self.parent_id][0] if self.parent_id in stored else ''
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError("Category cannot be moved under itself or its descendants")
+            self.path = paths.child_path(parent_path, self.pk)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'path'}
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.path:
+                Category.objects.move_subtree(old_path, self.path)
+
+            # The subtree total moves from the old ancestors to the new ones
+            if count and (old_parent_id, was_active) != (self.parent_id, self.is_active):
+                starts = Counter()
+                if was_active and old_parent_id:
+                    starts[paths.parent_path(old_path)] -= count
+                if self.is_active and self.parent_id:
+                    starts[parent_path] += count
+                Category.objects.add_subtree_counts(starts)
 
     @property
     def get_children(self):
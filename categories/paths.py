@@ -0,0 +1,79 @@
+"""Materialized paths for the category tree.
+
+A category's path is the hex ids of its ancestors followed by its own, with
+no separator: every segment is ``SEGMENT_LENGTH`` characters of ``0-9a-f``.
+The subtree of a category is then the range ``[path, path + 'g')``, which
+an ordinary btree index on ``path`` can answer; ``'g'`` sorts after every
+hex digit in both byte-wise and locale collations.
+"""
+import uuid
+
+SEGMENT_LENGTH = 32
+MAX_DEPTH = 16
+MAX_LENGTH = SEGMENT_LENGTH * MAX_DEPTH
+UPPER_BOUND = 'g'
+
+
+def segment(pk):
+    return pk.hex
+
+
+def child_path(parent_path, pk):
+    return (parent_path or '') + segment(pk)
+
+
+def parent_path(path):
+    return path[:-SEGMENT_LENGTH]
+
+
+def ancestor_ids(path):
+    """Ids along ``path``, the node itself first and the root last."""
+    return [uuid.UUID(path[i:i + SEGMENT_LENGTH])
+            for i in range(len(path) - SEGMENT_LENGTH, -1, -SEGMENT_LENGTH)]
+
+
+def subtree_range(path):
+    """``(lower, upper)`` bounds of ``path`` and everything below it."""
+    return path, path + UPPER_BOUND
+
+
+def depth(path):
+    return len(path) // SEGMENT_LENGTH
+
+
+def build_paths(parents):
+    """Paths for ``{id: parent_id}``, computed top-down from the roots.
+
+    Returns ``(paths, orphans)``; ``orphans`` are ids stuck in a parent cycle,
+    which have no root to hang from and get no path.
+    """
+    children = {}
+    for pk, parent_id in parents.items():
+        # A parent missing from the mapping is treated like no parent
+        key = parent_id if parent_id in parents else None
+        children.setdefault(key, []).append(pk)
+
+    paths = {}
+    stack = [(pk, '') for pk in children.get(None, [])]
+    while stack:
+        pk, prefix = stack.pop()
+        paths[pk] = child_path(prefix, pk)
+        stack.extend((child, paths[pk]) for child in children.get(pk, []))
+    return paths, [pk for pk in parents if pk not in paths]
+
+
+def subtree_counts(parents, active, direct):
+    """Subtree totals for ``{id: parent_id}`` given each node's own ``direct`` count.
+
+    A node's total is its direct count plus the totals of its active
+    children; an inactive node still has a total, it just doesn't reach its
+    parent.
+    """
+    paths, _ = build_paths(parents)
+    totals = {pk: direct.get(pk, 0) for pk in parents}
+    # Deepest first, so every child is complete before it is added to its parent
+    for pk in sorted(paths, key=lambda pk: len(paths[pk]), reverse=True):
+        parent_id = parents[pk]
+        if active[pk] and parent_id in paths:
+            totals[parent_id] += totals[pk]
+    return totals
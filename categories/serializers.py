@@ -1,26 +1,55 @@
+from django.db.models import Max
+from django.db.models.functions import Length
 from rest_framework import serializers
+from core.serializers import ValuesSerializer
 from .models import *
+from . import paths
 
 class CategorySerializer(serializers.ModelSerializer):
     children = serializers.SerializerMethodField()
-    product_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
         fields = ['id', 'title', 'slug', 'parent', 'is_active',
-                 'children', 'product_count', 'created_at', 'updated_at']
-        read_only_fields = ['slug', 'created_at', 'updated_at']
+                 'children', 'product_count', 'subtree_product_count', 'created_at', 'updated_at']
+        read_only_fields = ['slug', 'product_count', 'subtree_product_count', 'created_at', 'updated_at']
 
     def get_children(self, obj):
-        children = obj.get_children
+        # Views pass a preloaded CategoryTree, otherwise fall back to per-node queries
+        tree = self.context.get('category_tree')
+        children = tree.get_children(obj) if tree is not None else obj.get_children
         if children:
-            return CategorySerializer(children, many=True).data
+            return CategorySerializer(children, many=True, context=self.context).data
         return []
 
-    def get_product_count(self, obj):
-        return obj.products.filter(is_active=True).count()
+class CategorySummarySerializer(serializers.ModelSerializer):
+    # Flat representation for embedding in product payloads, no children or counts
+    parent_id = serializers.UUIDField(read_only=True)
+
+    class Meta:
+        model = Category
+        fields = ['id', 'title', 'slug', 'parent_id']
+
+
+class CategorySummaryValuesSerializer(ValuesSerializer):
+    serializer_class = CategorySummarySerializer
+    columns = ['id', 'title', 'slug', 'parent_id']
+
 
 class CategoryCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['title', 'parent', 'is_active']
\ No newline at end of file
+        fields = ['title', 'parent', 'is_active']
+
+    def validate_parent(self, parent):
+        if parent is None:
+            return parent
+        if self.instance is not None and self.instance.path and parent.path.startswith(self.instance.path):
+            raise serializers.ValidationError("Kategoriyani o'zining ichiga ko'chirib bo'lmaydi")
+        height = 1
+        if self.instance is not None and self.instance.path:
+            deepest = Category.objects.subtree(self.instance).aggregate(length=Max(Length('path')))['length']
+            height = (deepest - len(self.instance.path)) // paths.SEGMENT_LENGTH + 1
+        if paths.depth(parent.path) + height > paths.MAX_DEPTH:
+            raise serializers.ValidationError("Kategoriyalar daraxti juda chuqur")
+        return parent
\ No newline at end of file
@@ -0,0 +1,31 @@
+from django.db.models import Sum
+from django.db.models.functions import Length
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import paths
+from .cache import category_tree_cache
+from .models import Category
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    category_tree_cache.invalidate_on_commit()
+
+
+@receiver(post_delete, sender=Category)
+def detach_subtree(sender, instance, **kwargs):
+    # Children were set to parent=NULL by the delete, drop the removed prefix
+    # so they become roots along with their own descendants
+    if not instance.path:
+        return
+    if instance.is_active and paths.parent_path(instance.path):
+        # Its own products went with it, the children's totals leave too
+        children = Category.objects.subtree(instance).filter(is_active=True).annotate(
+            length=Length('path')).filter(length=len(instance.path) + paths.SEGMENT_LENGTH)
+        count = children.aggregate(total=Sum('subtree_product_count'))['total'] or 0
+        Category.objects.add_subtree_counts({paths.parent_path(instance.path): -count})
+    Category.objects.move_subtree(instance.path, '')
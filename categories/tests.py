@@ -1,3 +1,358 @@
-from django.test import TestCase
+import json
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.core import checks
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from products.importer import ProductImporter
+from products.models import Product
+from .cache import category_tree_cache
+from .management.commands.reconcile_category_counts import expected_counts
+from .models import Category
+from .serializers import CategorySerializer
+from .views import CategoryListView
+
+
+class CategoryTreeQueryCountTest(TestCase):
+
+    def create_tree(self, prefix, depth, width, parent=None):
+        for i in range(width):
+            category = Category.objects.create(title=f'{prefix} {depth}-{i}', parent=parent)
+            Product.objects.create(title=f'{category.title} product', description='x',
+                                   price=1, category=category)
+            if depth > 1:
+                self.create_tree(prefix, depth - 1, width, category)
+        Category.objects.create(title=f'{prefix} hidden', parent=parent, is_active=False)
+
+    def setUp(self):
+        category_tree_cache.cache.clear()
+
+    def capture(self, url):
+        # Measure a cold build of the cached list too
+        category_tree_cache.cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_is_constant_in_tree_size(self):
+        self.create_tree('A', depth=2, width=1)
+        _, small = self.capture(reverse('category-list'))
+
+        self.create_tree('B', depth=3, width=3)
+        response, large = self.capture(reverse('category-list'))
+
+        self.assertEqual(small, large)
+        self.assertEqual(response.json()['count'], 4)
+
+    def test_detail_query_count_is_constant_in_subtree_size(self):
+        self.create_tree('A', depth=1, width=1)
+        self.create_tree('B', depth=3, width=3)
+        _, small = self.capture(reverse('category-detail', kwargs={'slug': 'a-1-0'}))
+        _, large = self.capture(reverse('category-detail', kwargs={'slug': 'b-3-0'}))
+        self.assertEqual(small, large)
+
+    def test_tree_matches_per_node_serialization(self):
+        self.create_tree('A', depth=3, width=2)
+        Product.objects.create(title='Hidden', description='x', price=1, is_active=False,
+                               category=Category.objects.get(slug='a-3-0'))
+        category_tree_cache.cache.clear()
+        results = self.client.get(reverse('category-list')).json()['results']
+
+        roots = Category.objects.filter(is_active=True, parent__isnull=True)
+        expected = json.loads(JSONRenderer().render(CategorySerializer(roots, many=True).data))
+        self.assertEqual(results, expected)
+        self.assertEqual(results[0]['product_count'], 1)
+        self.assertEqual(len(results[0]['children']), 2)
+
+
+class CategoryPathTest(TestCase):
+
+    def setUp(self):
+        self.root = Category.objects.create(title='Root')
+        self.child = Category.objects.create(title='Child', parent=self.root)
+        self.leaf = Category.objects.create(title='Leaf', parent=self.child)
+        self.other = Category.objects.create(title='Other')
+
+    def paths(self):
+        return dict(Category.objects.values_list('slug', 'path'))
+
+    def test_path_follows_ancestors(self):
+        self.assertEqual(self.leaf.path, self.root.id.hex + self.child.id.hex + self.leaf.id.hex)
+        self.assertEqual(set(Category.objects.subtree(self.root)), {self.root, self.child, self.leaf})
+
+    def test_reparent_rewrites_descendants(self):
+        self.child.parent = self.other
+        self.child.save()
+        paths = self.paths()
+        self.assertEqual(paths['child'], self.other.id.hex + self.child.id.hex)
+        self.assertEqual(paths['leaf'], paths['child'] + self.leaf.id.hex)
+        self.assertEqual(set(Category.objects.subtree(self.root)), {self.root})
+
+    def test_cannot_move_under_descendant(self):
+        self.root.parent = self.leaf
+        with self.assertRaises(ValueError):
+            self.root.save()
+
+    def test_delete_detaches_children(self):
+        self.root.delete()
+        self.assertEqual(self.paths()['leaf'], self.child.id.hex + self.leaf.id.hex)
+
+    def test_rebuild_command(self):
+        expected = self.paths()
+        Category.objects.update(path='')
+        call_command('rebuild_category_paths', stdout=StringIO())
+        self.assertEqual(self.paths(), expected)
+
+
+class ProductCategoryTreeFilterTest(TestCase):
+
+    def setUp(self):
+        self.root = Category.objects.create(title='Root')
+        self.child = Category.objects.create(title='Child', parent=self.root)
+        self.hidden = Category.objects.create(title='Hidden', parent=self.root, is_active=False)
+        hidden_leaf = Category.objects.create(title='Hidden leaf', parent=self.hidden)
+        other = Category.objects.create(title='Other')
+        for category in (self.root, self.child, self.hidden, hidden_leaf, other):
+            Product.objects.create(title=f'{category.title} product', description='x',
+                                   price=1, category=category)
+
+    def titles(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(product['title'] for product in response.data['results'])
+
+    def test_list_and_search_filter_by_subtree(self):
+        expected = ['Child product', 'Root product']
+        for name in ('product-list', 'product-search'):
+            self.assertEqual(self.titles(name, category_tree='root'), expected)
+            self.assertEqual(self.titles(name, category_tree=str(self.root.id)), expected)
+            self.assertEqual(self.titles(name, category_tree='child'), ['Child product'])
+            self.assertEqual(self.titles(name, category_tree='missing'), [])
+
+    def test_moved_subtree_is_listed_under_new_parent(self):
+        self.child.parent = None
+        self.child.save()
+        self.assertEqual(self.titles('product-list', category_tree='root'), ['Root product'])
+
+
+class CategoryProductCountTest(TestCase):
+
+    def setUp(self):
+        self.root = Category.objects.create(title='Root')
+        self.child = Category.objects.create(title='Child', parent=self.root)
+        self.leaf = Category.objects.create(title='Leaf', parent=self.child)
+        self.other = Category.objects.create(title='Other')
+
+    def add_product(self, category, **kwargs):
+        return Product.objects.create(title='Product', description='x', price=1,
+                                      category=category, **kwargs)
+
+    def counts(self):
+        return {slug: (direct, subtree) for slug, direct, subtree in
+                Category.objects.values_list('slug', 'product_count', 'subtree_product_count')}
+
+    def assertConsistent(self):
+        rows = Category.objects.values_list('id', 'parent_id', 'is_active')
+        stored = {pk: (direct, subtree) for pk, direct, subtree in
+                  Category.objects.values_list('id', 'product_count', 'subtree_product_count')}
+        self.assertEqual(stored, expected_counts(list(rows)))
+
+    def test_product_changes_roll_up(self):
+        product = self.add_product(self.leaf)
+        self.add_product(self.child)
+        self.add_product(self.leaf, is_active=False)
+        self.assertEqual(self.counts()['root'], (0, 2))
+        self.assertEqual(self.counts()['leaf'], (1, 1))
+
+        product.category = self.other
+        product.save()
+        self.assertEqual(self.counts()['root'], (0, 1))
+        self.assertEqual(self.counts()['other'], (1, 1))
+
+        product.is_active = False
+        product.save()
+        self.assertEqual(self.counts()['other'], (0, 0))
+        product.is_active = True
+        product.save(update_fields=['is_active'])
+        product.delete()
+        self.assertConsistent()
+
+    def test_category_changes_move_totals(self):
+        self.add_product(self.leaf)
+        self.add_product(self.child)
+
+        self.child.parent = self.other
+        self.child.save()
+        self.assertEqual(self.counts()['root'], (0, 0))
+        self.assertEqual(self.counts()['other'], (0, 2))
+
+        self.leaf.is_active = False
+        self.leaf.save()
+        self.assertEqual(self.counts()['other'], (0, 1))
+        self.assertEqual(self.counts()['leaf'], (1, 1))
+
+        # A stale instance must not write its old counters back
+        stale = Category.objects.get(slug='child')
+        self.add_product(self.child)
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertConsistent()
+
+        self.child.delete()
+        self.assertConsistent()
+
+    def test_bulk_import_updates_counts(self):
+        rows = [{'title': f'Imported {i}', 'description': 'x', 'price': '1', 'category': 'leaf'}
+                for i in range(3)]
+        ProductImporter(batch_size=2).run(rows)
+        self.assertEqual(self.counts()['root'], (0, 3))
+        self.assertConsistent()
+
+    def test_reconcile_command_fixes_drift(self):
+        self.add_product(self.leaf)
+        Category.objects.update(product_count=7, subtree_product_count=0)
+        call_command('reconcile_category_counts', stdout=StringIO())
+        self.assertConsistent()
+        self.assertEqual(self.counts()['root'], (0, 1))
+
+    def test_counts_are_written_in_one_locked_update(self):
+        product = self.add_product(self.leaf)
+        product.category = self.other
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+        updates = [q['sql'] for q in queries.captured_queries
+                   if q['sql'].startswith('UPDATE "categories_category"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.counts()['leaf'], (0, 0))
+        self.assertEqual(self.counts()['other'], (1, 1))
+        self.assertConsistent()
+
+    def test_hidden_branches_leave_the_tree_version_alone(self):
+        self.child.is_active = False
+        self.child.save()
+        with mock.patch.object(category_tree_cache, 'invalidate_on_commit') as invalidate:
+            self.add_product(self.leaf)
+            invalidate.assert_not_called()
+            self.add_product(self.child)
+            invalidate.assert_not_called()
+            self.add_product(self.root)
+            invalidate.assert_called_once_with()
+        self.assertConsistent()
+
+    def test_endpoints_read_stored_counts(self):
+        self.add_product(self.leaf)
+        response = self.client.get(reverse('category-detail', kwargs={'slug': 'root'}))
+        self.assertEqual(response.data['product_count'], 0)
+        self.assertEqual(response.data['subtree_product_count'], 1)
+        self.assertEqual(response.data['children'][0]['children'][0]['product_count'], 1)
+
+
+class CategoryConditionalGetTest(TestCase):
+
+    def setUp(self):
+        self.root = Category.objects.create(title='Root')
+        self.hidden = Category.objects.create(title='Hidden', parent=self.root, is_active=False)
+        self.leaf = Category.objects.create(title='Leaf', parent=self.hidden)
+        self.product = Product.objects.create(title='Product', description='x', price=1,
+                                              category=self.leaf)
+        patcher = mock.patch.object(category_tree_cache, 'schedule_warm')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def etags(self):
+        urls = [reverse('category-list'), reverse('category-list') + '?search=root',
+                *[reverse('category-detail', kwargs={'slug': slug}) for slug in ('root', 'leaf')]]
+        etags = []
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Last-Modified', response)
+            etags.append(response['ETag'])
+        return etags
+
+    def test_product_edits_outside_the_counts_keep_the_etags(self):
+        etags = self.etags()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('category-list') + '?search=root', HTTP_IF_NONE_MATCH=etags[1])
+        self.assertEqual(queries.captured_queries, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.add_ratings({self.product.pk: {'rating_sum': 5, 'total_ratings': 1,
+                                                           'rating_5': 1}})
+            self.product.title = 'Renamed'
+            self.product.save()
+        self.assertEqual(self.etags(), etags)
+
+    def test_counts_under_a_hidden_branch_change_its_detail_etag(self):
+        etags = self.etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(title='Other', description='x', price=1, category=self.leaf)
+        new_etags = self.etags()
+        # The tree version stays, the leaf's own rows don't
+        self.assertEqual(new_etags[:2], etags[:2])
+        self.assertNotEqual(new_etags[3], etags[3])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hidden.is_active = True
+            self.hidden.save()
+        self.assertTrue(all(old != new for old, new in zip(new_etags[:3], self.etags()[:3])))
+
+
+class CategoryTreeCacheTest(TestCase):
+
+    def setUp(self):
+        category_tree_cache.cache.clear()
+        for i in range(25):
+            root = Category.objects.create(title=f'Root {i:02}')
+            Category.objects.create(title=f'Child {i:02}', parent=root)
+
+    def get(self, url, **extra):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **extra)
+        return response, len(queries)
+
+    def test_cached_pages_match_uncached_responses(self):
+        url = reverse('category-list')
+        for page_url in (url, url + '?page=2'):
+            cached = self.client.get(page_url).content
+            with mock.patch.object(CategoryListView, 'get_cached_page_number', return_value=None):
+                uncached = self.client.get(page_url).content
+            self.assertEqual(cached, uncached)
+
+    def test_warm_pages_are_served_without_queries(self):
+        url = reverse('category-list')
+        category_tree_cache.build()
+        response, queries = self.get(url)
+        self.assertEqual(queries, 0)
+        self.assertEqual(response.json()['count'], 25)
+
+        response, queries = self.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, 0)
+
+    def test_changes_bump_the_version(self):
+        url = reverse('category-list')
+        etag = self.client.get(url)['ETag']
+        with mock.patch.object(category_tree_cache, 'schedule_warm') as schedule_warm:
+            with self.captureOnCommitCallbacks(execute=True):
+                Product.objects.create(title='Product', description='x', price=1,
+                                       category=Category.objects.get(slug='child-00'))
+        schedule_warm.assert_called()
+
+        response = self.client.get(url)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['children'][0]['product_count'], 1)
+
+    def test_deploy_check_requires_a_shared_backend(self):
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}
+        for backend, warns in ((locmem, True), (redis, False)):
+            with override_settings(CACHES={'default': locmem, 'products': backend}):
+                issues = checks.run_checks(tags=[checks.Tags.caches], include_deployment_checks=True)
+            self.assertEqual('categories.W001' in {issue.id for issue in issues}, warns)
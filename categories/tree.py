@@ -0,0 +1,24 @@
+from collections import defaultdict
+
+from .models import Category
+
+
+class CategoryTree:
+    """All active categories, loaded in one query and linked in memory for
+    CategorySerializer. Product counts are stored on the rows."""
+
+    def __init__(self, categories):
+        self.children = defaultdict(list)
+        # Categories arrive in Meta.ordering, so every child list keeps it
+        for category in categories:
+            self.children[category.parent_id].append(category)
+
+    @classmethod
+    def load(cls):
+        return cls(Category.objects.filter(is_active=True))
+
+    def get_roots(self):
+        return self.children.get(None, [])
+
+    def get_children(self, category):
+        return self.children.get(category.id, [])
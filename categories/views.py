@@ -1,23 +1,86 @@
 from rest_framework import generics, permissions, filters
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.utils.cache import get_conditional_response
+from .cache import category_tree_cache
 from .models import Category
 from .serializers import *
+from .tree import CategoryTree
+from core.mixins import ConditionalGetMixin
 from core.permissions import IsAdminOrReadOnly
 
-class CategoryListView(generics.ListAPIView):
+
+class CategoryTreeValidatorsMixin(ConditionalGetMixin):
+    # Category payloads embed children and product counts, both stored on
+    # the category rows. The tree version moves with every visible change
+    def get_validators(self):
+        return str(category_tree_cache.version()), None
+
+
+class CategoryTreeContextMixin:
+    # Children and product counts for the whole response come from one tree load
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['category_tree'] = CategoryTree.load()
+        return context
+
+
+class CategoryListView(CategoryTreeValidatorsMixin, CategoryTreeContextMixin, generics.ListAPIView):
     queryset = Category.objects.filter(is_active=True, parent__isnull=True)
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     search_fields = ['title']
 
-class CategoryDetailView(generics.RetrieveAPIView):
+    def get(self, request, *args, **kwargs):
+        # The storefront's plain ?page=N requests are answered from the cached pages
+        page_number = self.get_cached_page_number()
+        if page_number is None:
+            return super().get(request, *args, **kwargs)
+        version, entry = category_tree_cache.get()
+        if page_number > len(entry['pages']):
+            return super().get(request, *args, **kwargs)
+
+        etag = self.get_etag(str(version))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.get_cached_page(entry, page_number)
+        response.headers['ETag'] = etag
+        return response
+
+    def get_cached_page_number(self):
+        if self.request.accepted_renderer.format != 'json':
+            return None
+        param = self.paginator.page_query_param
+        if set(self.request.query_params) - {param}:
+            return None
+        value = self.request.query_params.get(param, '1')
+        if not value.isdigit() or int(value) < 1:
+            return None
+        return int(value)
+
+    def get_cached_page(self, entry, page_number):
+        # Paginate placeholders for the root count, so count and links come
+        # from the paginator itself; the cached rows become the results
+        self.paginator.paginate_queryset(range(entry['count']), self.request, view=self)
+        return self.paginator.get_paginated_response(entry['pages'][page_number - 1])
+
+class CategoryDetailView(CategoryTreeValidatorsMixin, CategoryTreeContextMixin, generics.RetrieveAPIView):
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
 
+    def get_validators(self):
+        # An active category under a soft-deleted one is outside the tree
+        # version, so fingerprint the rows of its own subtree
+        category = self.get_queryset().filter(slug=self.kwargs['slug']).only('path').first()
+        if category is None:
+            return None, None
+        rows = Category.objects.subtree(category).filter(is_active=True).order_by('path').values_list(
+            'id', 'parent_id', 'updated_at', 'product_count', 'subtree_product_count')
+        return ';'.join(':'.join(map(str, row)) for row in rows), None
+
 class CategoryCreateView(generics.CreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategoryCreateUpdateSerializer
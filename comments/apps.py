@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class CommentsConfig(AppConfig):
     name = 'comments'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from core.checks import shared_cache_check
+
+        checks.register(shared_cache_check('PRODUCT_COMMENTS_CACHE_ALIAS', 'comments.W001'),
+                        checks.Tags.caches, deploy=True)
@@ -0,0 +1,22 @@
+from django.conf import settings
+
+from products.cache import ProductDetailCache
+
+
+class ProductCommentsCache(ProductDetailCache):
+    """
+    First page of ProductCommentsListView per product slug.
+
+    Same versioning as the product detail cache, and the same requirement
+    of a backend shared by all workers. ``can_edit`` depends on the
+    requesting user, so the view recomputes it on every response.
+    """
+    prefix = 'product-comments'
+    alias_setting = 'PRODUCT_COMMENTS_CACHE_ALIAS'
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'PRODUCT_COMMENTS_CACHE_TIMEOUT', 300)
+
+
+product_comments_cache = ProductCommentsCache()
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from comments.services import RatingRecomputer
+
+
+class Command(BaseCommand):
+    help = "Mahsulot reytinglari va baholar sonini faol izohlardan qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Bir tranzaksiyada tekshiriladigan mahsulotlar soni "
+                                 "(0 - hammasi bitta agregat bilan)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="bulk_update uchun batch hajmi")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Faqat farqlarni sanash, saqlamaslik")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--chunk-size manfiy, --batch-size esa musbat bo'lmasligi kerak")
+
+        recomputer = RatingRecomputer(
+            chunk_size=options['chunk_size'] or None,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        ).run()
+        verb = "farq qiladi" if options['dry_run'] else "yangilandi"
+        self.stdout.write(self.style.SUCCESS(
+            f"{recomputer.products} ta mahsulot tekshirildi, {recomputer.changed} tasi {verb}"
+        ))
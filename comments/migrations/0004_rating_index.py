@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0003_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product', 'rating', 'id'], name='comment_active_rating_idx'),
+        ),
+    ]
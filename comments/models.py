@@ -1,4 +1,6 @@
-from django.db import models
+from collections import Counter, defaultdict
+
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from shared.models import BaseModel
 from users.models import User
@@ -18,25 +20,44 @@ class Comment(BaseModel):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['user', 'product']  # Har bir user faqat bir marta comment qoldirishi mumkin
+        indexes = [
+            models.Index(fields=['product', '-created_at'], condition=models.Q(is_active=True),
+                         name='comment_active_product_idx'),
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_active=True),
+                         name='comment_active_user_idx'),
+            # Keyset pages of ?ordering=rating / -rating
+            models.Index(fields=['product', 'rating', 'id'], condition=models.Q(is_active=True),
+                         name='comment_active_rating_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.product.title}"
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
-
-
-        if is_new:
-            self.update_product_rating()
-
-    def update_product_rating(self):
-        product = self.product
-        comments = product.comments.filter(is_active=True)
-
-        if comments.exists():
-            total_rating = sum(comment.rating for comment in comments)
-            avg_rating = total_rating / comments.count()
-            product.rating = round(avg_rating, 1)
-            product.total_ratings = comments.count()
-            product.save()
\ No newline at end of file
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'product', 'product_id', 'rating', 'is_active'} & set(update_fields):
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            stored = None
+            if not self._state.adding:
+                stored = Comment.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'product_id', 'rating', 'is_active').first()
+            super().save(*args, **kwargs)
+            deltas = rating_deltas(removed=[stored[:2]] if stored and stored[2] else [],
+                                   added=[(self.product_id, self.rating)] if self.is_active else [])
+            Product.objects.add_ratings(deltas)
+
+
+def rating_deltas(removed=(), added=()):
+    """``{product_id: {column: delta}}`` for ``(product_id, rating)`` pairs."""
+    deltas = defaultdict(Counter)
+    for sign, pairs in ((-1, removed), (1, added)):
+        for product_id, rating in pairs:
+            deltas[product_id].update({
+                'rating_sum': sign * rating,
+                'total_ratings': sign,
+                f'rating_{rating}': sign,
+            })
+    return deltas
\ No newline at end of file
@@ -1,6 +1,13 @@
 from rest_framework import serializers
 from .models import Comment
-from users.serializers import UserProfileSerializer
+from core.serializers import ValuesSerializer
+from users.serializers import UserProfileSerializer, UserProfileValuesSerializer
+
+
+def can_edit(request, user_id):
+    if request and request.user:
+        return user_id == request.user.pk or request.user.is_staff
+    return False
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -15,10 +22,8 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'product', 'created_at', 'updated_at']
 
     def get_can_edit(self, obj):
-        request = self.context.get('request')
-        if request and request.user:
-            return obj.user == request.user or request.user.is_staff
-        return False
+        # Compare ids, obj.user would load the user row
+        return can_edit(self.context.get('request'), obj.user_id)
 
     def validate(self, data):
         # Faqat bir marta comment qoldirishni tekshirish
@@ -38,6 +43,28 @@ class CommentSerializer(serializers.ModelSerializer):
         return data
 
 
+class CommentValuesSerializer(ValuesSerializer):
+    serializer_class = CommentSerializer
+    columns = ['id', 'user_id', 'product_id', 'product__title', 'text', 'rating',
+               'is_active', 'created_at', 'updated_at',
+               *UserProfileValuesSerializer.prefixed_columns('user__')]
+    sources = {'product_title': 'product__title'}
+    computed = ('user', 'product', 'can_edit')
+
+    def __init__(self, context=None, prefix=''):
+        super().__init__(context, prefix)
+        self.user_serializer = UserProfileValuesSerializer(self.context, prefix=f'{prefix}user__')
+
+    def get_user(self, row):
+        return self.user_serializer.to_representation(row)
+
+    def get_product(self, row):
+        return self.value(row, 'product_id')
+
+    def get_can_edit(self, row):
+        return can_edit(self.request, self.value(row, 'user_id'))
+
+
 class CommentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
@@ -47,4 +74,36 @@ class CommentCreateSerializer(serializers.ModelSerializer):
 class CommentUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
-        fields = ['text', 'rating']
\ No newline at end of file
+        fields = ['text', 'rating']
+
+
+class CommentModerationSerializer(serializers.Serializer):
+    ACTIONS = (('deactivate', 'deactivate'), ('restore', 'restore'))
+
+    action = serializers.ChoiceField(choices=ACTIONS)
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False,
+                                allow_empty=False, max_length=1000)
+    user = serializers.UUIDField(required=False)
+    product = serializers.SlugField(required=False)
+    text = serializers.CharField(required=False, min_length=3)
+
+    def validate(self, data):
+        # Without any selector the whole comments table would match
+        if not {'ids', 'user', 'product', 'text'} & set(data):
+            raise serializers.ValidationError(
+                "ids yoki kamida bitta filtr (user, product, text) kerak"
+            )
+        return data
+
+    def get_queryset(self):
+        data = self.validated_data
+        comments = Comment.objects.all()
+        if 'ids' in data:
+            comments = comments.filter(id__in=data['ids'])
+        if 'user' in data:
+            comments = comments.filter(user_id=data['user'])
+        if 'product' in data:
+            comments = comments.filter(product__slug=data['product'])
+        if 'text' in data:
+            comments = comments.filter(text__icontains=data['text'])
+        return comments
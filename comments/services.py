@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from products.cache import product_detail_cache
+from products.models import RATING_STARS, Product, rating_expression
+from .cache import product_comments_cache
+from .models import Comment
+
+RATING_COLUMNS = ('rating', 'rating_sum', 'total_ratings', *(f'rating_{star}' for star in RATING_STARS))
+NO_RATINGS = {'rating': 0.0, **dict.fromkeys(RATING_COLUMNS[1:], 0)}
+
+
+def rating_aggregates(product_ids=None):
+    """``{product_id: {column: value}}`` from active comments, one grouped query.
+
+    The average goes through the same SQL expression as ``add_ratings``, so
+    a recomputed rating compares equal to an incrementally maintained one.
+    """
+    comments = Comment.objects.filter(is_active=True)
+    if product_ids is not None:
+        comments = comments.filter(product_id__in=product_ids)
+    rows = comments.order_by().values('product').annotate(
+        rating_sum=Sum('rating'),
+        total_ratings=Count('id'),
+        **{f'rating_{star}': Count('id', filter=Q(rating=star)) for star in RATING_STARS},
+    ).annotate(rating=rating_expression(Sum('rating'), Count('id')))
+    return {row.pop('product'): row for row in rows}
+
+
+class RatingRecomputer:
+    """Rebuilds every product's rating columns from its active comments.
+
+    Products are walked in primary key chunks. Each chunk locks its product
+    rows, which makes concurrent comment writes queue behind it and apply
+    their deltas on top of the recomputed values. With ``chunk_size=None``
+    the whole table is done in one transaction and one aggregate.
+    """
+
+    def __init__(self, chunk_size=2000, batch_size=500, dry_run=False):
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.products = self.changed = 0
+
+    def run(self):
+        if not self.chunk_size:
+            self._process(None)
+            return self
+        last_id = None
+        while True:
+            products = Product.objects.order_by('pk')
+            if last_id is not None:
+                products = products.filter(pk__gt=last_id)
+            ids = list(products.values_list('pk', flat=True)[:self.chunk_size])
+            if not ids:
+                break
+            self._process(ids)
+            last_id = ids[-1]
+        return self
+
+    def _process(self, ids):
+        checked, changed = recompute_products(ids, batch_size=self.batch_size, dry_run=self.dry_run)
+        self.products += checked
+        self.changed += changed
+
+
+def recompute_products(ids, batch_size=500, dry_run=False):
+    """Rewrites the rating columns of ``ids`` (every product for ``None``)
+    that differ from their comments; returns ``(checked, changed)``."""
+    with transaction.atomic():
+        products = Product.objects.select_for_update().only('id', 'slug', *RATING_COLUMNS)
+        if ids is not None:
+            products = products.filter(pk__in=ids)
+        products = list(products.order_by('pk'))
+        expected = rating_aggregates(ids)
+
+        now = timezone.now()
+        changed = []
+        for product in products:
+            values = expected.get(product.pk, NO_RATINGS)
+            if any(getattr(product, column) != values[column] for column in RATING_COLUMNS):
+                for column in RATING_COLUMNS:
+                    setattr(product, column, values[column])
+                product.updated_at = now
+                changed.append(product)
+
+        if changed and not dry_run:
+            Product.objects.bulk_update(changed, [*RATING_COLUMNS, 'updated_at'], batch_size=batch_size)
+            product_detail_cache.invalidate_on_commit(*[product.slug for product in changed])
+    return len(products), len(changed)
+
+
+def moderate_comments(comments, is_active):
+    """Deactivates or restores ``comments`` with one UPDATE, then recomputes
+    the ratings of the affected products in one aggregate pass.
+
+    Returns ``(comments updated, products affected)``.
+    """
+    with transaction.atomic():
+        targets = comments.filter(is_active=not is_active)
+        product_ids = list(targets.order_by().values_list('product_id', flat=True).distinct())
+        # Comment rows first, then products, the same lock order as Comment.save()
+        updated = targets.update(is_active=is_active, updated_at=timezone.now())
+        if product_ids:
+            # Every flipped comment moves its product's rating counts, so the
+            # recompute already invalidates the detail cache of each product
+            recompute_products(product_ids)
+            slugs = list(Product.objects.filter(pk__in=product_ids).values_list('slug', flat=True))
+            product_comments_cache.invalidate_on_commit(*slugs)
+    return updated, len(product_ids)
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.cache import product_detail_cache
+from products.models import Product
+from users.models import User
+from .cache import product_comments_cache
+from .models import Comment, rating_deltas
+
+# User fields shown next to every comment
+COMMENT_USER_FIELDS = {'first_name', 'last_name', 'email', 'phone_number', 'username',
+                       'auth_status', 'auth_type', 'photo', 'photo_thumbnails'}
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_product_detail(sender, instance, raw=False, **kwargs):
+    # rating and total_comments in the product payload depend on comments
+    if raw:
+        return
+    slug = Product.objects.filter(pk=instance.product_id).values_list('slug', flat=True).first()
+    if slug:
+        product_detail_cache.invalidate_on_commit(slug)
+        product_comments_cache.invalidate_on_commit(slug)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_product_comments(sender, instance, raw=False, **kwargs):
+    # product_title is part of every cached comment
+    if not raw:
+        product_comments_cache.invalidate_on_commit(instance.slug)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_comments(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not COMMENT_USER_FIELDS & set(update_fields)):
+        return
+    slugs = Comment.objects.filter(user=instance, is_active=True).values_list('product__slug', flat=True)
+    product_comments_cache.invalidate_on_commit(*slugs)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_rating(sender, instance, **kwargs):
+    if instance.is_active:
+        Product.objects.add_ratings(rating_deltas(removed=[(instance.product_id, instance.rating)]))
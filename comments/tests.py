@@ -1,3 +1,334 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core import checks
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from categories.models import Category
+from products.models import Product
+from users.models import User, CLIENT, DONE
+from .cache import product_comments_cache
+from .models import Comment
+from .services import RATING_COLUMNS, rating_aggregates
+
+
+class ProductCommentsValuesSerializationTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Phones')
+        cls.product = Product.objects.create(
+            title='Phone', description='Smartphone', price=100, quantity=1, category=category,
+        )
+        statuses = [CLIENT, DONE, None]
+        for i, auth_status in enumerate(statuses):
+            user = User.objects.create(username=f'reviewer{i}', password='x',
+                                       email=f'reviewer{i}@example.com')
+            if auth_status:
+                User.objects.filter(pk=user.pk).update(auth_status=auth_status)
+            Comment.objects.create(user=user, product=cls.product, text=f'Comment {i}', rating=i + 3)
+        cls.author = User.objects.get(username='reviewer0')
+
+    def setUp(self):
+        product_comments_cache.cache.clear()
+
+    def assertSameJson(self, url):
+        fast = self.client.get(url)
+        product_comments_cache.cache.clear()
+        with override_settings(VALUES_LIST_SERIALIZATION=False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_values_rows_render_identical_json(self):
+        url = reverse('product-comments', kwargs={'slug': self.product.slug})
+        response = self.assertSameJson(url)
+        self.assertEqual(len(response.data['results']), 3)
+
+        self.assertSameJson(url + '?ordering=rating')
+
+        self.client.force_authenticate(self.author)
+        response = self.assertSameJson(url)
+        self.assertEqual(sum(comment['can_edit'] for comment in response.data['results']), 1)
+
+
+class ProductCommentsListTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Phones')
+        cls.product = Product.objects.create(title='Phone', description='x', price=1, category=category)
+        cls.empty = Product.objects.create(title='Tablet', description='x', price=1, category=category)
+        cls.users = [User.objects.create(username=f'writer{i}', password='x',
+                                         email=f'writer{i}@example.com') for i in range(25)]
+        for i, user in enumerate(cls.users):
+            Comment.objects.create(user=user, product=cls.product, text=f'Comment {i}', rating=i % 5 + 1)
+
+    def setUp(self):
+        product_comments_cache.cache.clear()
+
+    def url(self, product):
+        return reverse('product-comments', kwargs={'slug': product.slug})
+
+    def test_missing_product_is_404_and_empty_product_is_200(self):
+        response = self.client.get(reverse('product-comments', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(self.url(self.empty))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_keyset_pages_cover_every_comment_once(self):
+        for ordering in ('-created_at', 'rating', '-rating'):
+            seen = []
+            url = f'{self.url(self.product)}?ordering={ordering}'
+            with CaptureQueriesContext(connection) as queries:
+                while url:
+                    response = self.client.get(url)
+                    seen.extend(comment['id'] for comment in response.data['results'])
+                    url = response.data['next']
+            self.assertEqual(len(queries), 2)
+            self.assertEqual(len(seen), 25)
+            self.assertEqual(len(set(seen)), 25)
+
+    def test_first_page_is_cached_with_per_user_can_edit(self):
+        url = self.url(self.product)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertFalse(any(comment['can_edit'] for comment in response.data['results']))
+
+        author = self.users[-1]
+        self.client.force_authenticate(author)
+        response = self.client.get(url)
+        editable = [comment['user']['id'] for comment in response.data['results'] if comment['can_edit']]
+        self.assertEqual(editable, [str(author.pk)])
+
+    def test_comment_changes_invalidate_the_first_page(self):
+        url = self.url(self.product)
+        self.client.get(url)
+        comment = Comment.objects.get(user=self.users[-1])
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.text = 'Edited'
+            comment.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['text'], 'Edited')
+
+    def test_deploy_check_requires_a_shared_backend(self):
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}
+        for backend, warns in ((locmem, True), (redis, False)):
+            with override_settings(CACHES={'default': locmem, 'products': backend}):
+                issues = checks.run_checks(tags=[checks.Tags.caches], include_deployment_checks=True)
+            self.assertEqual('comments.W001' in {issue.id for issue in issues}, warns)
+
+
+class ProductRatingMaintenanceTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='Phones')
+        cls.product = Product.objects.create(title='Phone', description='x', price=100,
+                                             category=cls.category)
+        cls.users = [User.objects.create(username=f'rater{i}', password='x',
+                                         email=f'rater{i}@example.com') for i in range(12)]
+
+    def rate(self, user, rating, product=None):
+        return Comment.objects.create(user=user, product=product or self.product, text='x', rating=rating)
+
+    def stored(self, product=None):
+        product = Product.objects.get(pk=(product or self.product).pk)
+        return product.rating, product.rating_sum, product.total_ratings
+
+    def distribution(self):
+        return Product.objects.get(pk=self.product.pk).rating_distribution
+
+    def test_create_update_and_delete_keep_rating_exact(self):
+        comment = self.rate(self.users[0], 5)
+        self.rate(self.users[1], 4)
+        self.assertEqual(self.stored(), (4.5, 9, 2))
+
+        self.client.force_authenticate(self.users[0])
+        response = self.client.patch(reverse('comment-update', kwargs={'id': comment.id}), {'rating': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored(), (3.0, 6, 2))
+
+        self.assertEqual(self.distribution(), {1: 0, 2: 1, 3: 0, 4: 1, 5: 0})
+
+        response = self.client.delete(reverse('comment-delete', kwargs={'id': comment.id}))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.stored(), (4.0, 4, 1))
+        self.assertEqual(self.distribution(), {1: 0, 2: 0, 3: 0, 4: 1, 5: 0})
+
+        Comment.objects.get(user=self.users[1]).delete()
+        self.assertEqual(self.stored(), (0.0, 0, 0))
+        self.assertEqual(sum(self.distribution().values()), 0)
+
+    def test_distribution_in_detail_and_min_rating_filter(self):
+        low = Product.objects.create(title='Old phone', description='x', price=1, category=self.category)
+        for user, rating in zip(self.users, [5, 4, 4]):
+            self.rate(user, rating)
+        self.rate(self.users[3], 2, product=low)
+
+        # Keep the view out of the process-wide buffer, it would be flushed at exit
+        with mock.patch('products.views.view_counter'):
+            response = self.client.get(reverse('product-detail', kwargs={'slug': self.product.slug}))
+        self.assertEqual(response.data['rating_distribution'], {'1': 0, '2': 0, '3': 0, '4': 2, '5': 1})
+        self.assertEqual(response.data['total_ratings'], 3)
+
+        for name in ('product-list', 'product-search'):
+            response = self.client.get(reverse(name), {'min_rating': 4})
+            self.assertEqual([p['slug'] for p in response.data['results']], [self.product.slug])
+        for name in ('product-list', 'product-search'):
+            for value in ('x', 'nan', 'inf', '-inf', '0', '5.5'):
+                response = self.client.get(reverse(name), {'min_rating': value})
+                self.assertEqual(response.status_code, 400, (name, value))
+                self.assertIn('min_rating', response.data)
+
+    def test_moving_and_reactivating_a_comment(self):
+        other = Product.objects.create(title='Tablet', description='x', price=1, category=self.category)
+        comment = self.rate(self.users[0], 3)
+        comment.product = other
+        comment.save()
+        self.assertEqual(self.stored(), (0.0, 0, 0))
+        self.assertEqual(self.stored(other), (3.0, 3, 1))
+
+        comment.is_active = False
+        comment.save(update_fields=['is_active'])
+        comment.is_active = True
+        comment.save(update_fields=['is_active'])
+        comment.text = 'edited'
+        comment.save(update_fields=['text'])
+        self.assertEqual(self.stored(other), (3.0, 3, 1))
+
+    def test_stale_product_instance_keeps_ratings(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        self.rate(self.users[0], 5)
+        stale.price = 90
+        stale.save()
+        self.assertEqual(self.stored(), (5.0, 5, 1))
+
+    def test_cost_per_review_is_constant(self):
+        def queries_for(user):
+            with CaptureQueriesContext(connection) as queries:
+                self.rate(user, 4)
+            return len(queries)
+
+        first = queries_for(self.users[0])
+        for user in self.users[1:10]:
+            self.rate(user, 3)
+        self.assertEqual(queries_for(self.users[10]), first)
+
+
+class RecomputeRatingsCommandTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Phones')
+        cls.products = [Product.objects.create(title=f'Phone {i}', description='x', price=1,
+                                               category=category) for i in range(5)]
+        users = [User.objects.create(username=f'voter{i}', password='x',
+                                     email=f'voter{i}@example.com') for i in range(4)]
+        for i, product in enumerate(cls.products[:4]):
+            for user in users[:i + 1]:
+                Comment.objects.create(user=user, product=product, text='x', rating=1 + (i + 3) % 5)
+
+    def snapshot(self):
+        return list(Product.objects.order_by('pk').values_list(*RATING_COLUMNS))
+
+    def recompute(self, *args):
+        out = StringIO()
+        call_command('recompute_ratings', *args, stdout=out)
+        return out.getvalue()
+
+    def test_incremental_values_match_recomputed_ones(self):
+        expected = self.snapshot()
+        self.assertIn('0 tasi yangilandi', self.recompute())
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_drift_is_repaired_in_chunks_and_in_one_pass(self):
+        expected = self.snapshot()
+        for args in (['--chunk-size', '2', '--batch-size', '1'], ['--chunk-size', '0']):
+            Product.objects.update(rating=3.3, rating_sum=1, total_ratings=9, rating_5=2)
+            self.assertIn('5 tasi farq qiladi', self.recompute('--dry-run', *args))
+            self.assertIn('5 tasi yangilandi', self.recompute(*args))
+            self.assertEqual(self.snapshot(), expected)
+
+    def test_aggregates_cover_products_with_comments(self):
+        aggregates = rating_aggregates([product.pk for product in self.products])
+        self.assertEqual(len(aggregates), 4)
+        self.assertEqual(aggregates[self.products[3].pk]['total_ratings'], 4)
+
+
+class CommentModerationTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Phones')
+        cls.products = [Product.objects.create(title=f'Phone {i}', description='x', price=1,
+                                               category=category) for i in range(2)]
+        cls.spammer = User.objects.create(username='spammer', password='x', email='spam@example.com')
+        cls.staff = User.objects.create(username='moderator', password='x', email='mod@example.com',
+                                        is_staff=True)
+        users = [User.objects.create(username=f'buyer{i}', password='x',
+                                     email=f'buyer{i}@example.com') for i in range(6)]
+        for product in cls.products:
+            Comment.objects.create(user=cls.spammer, product=product, text='Buy cheap followers', rating=1)
+            for user in users[:3]:
+                Comment.objects.create(user=user, product=product, text='Good phone', rating=5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.staff)
+
+    def moderate(self, **data):
+        return self.client.post(reverse('comment-moderate'), data, format='json')
+
+    def ratings(self):
+        return [Product.objects.get(pk=p.pk).rating for p in self.products]
+
+    def test_deactivate_by_filter_and_restore_by_ids(self):
+        self.assertEqual(self.ratings(), [4.0, 4.0])
+        response = self.moderate(action='deactivate', user=str(self.spammer.pk), text='followers')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['updated'], response.data['products']), (2, 2))
+        self.assertEqual(self.ratings(), [5.0, 5.0])
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).rating_distribution[1], 0)
+
+        spam = Comment.objects.get(user=self.spammer, product=self.products[0])
+        response = self.moderate(action='restore', ids=[str(spam.pk)])
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(self.ratings(), [4.0, 5.0])
+
+        # Already in the requested state
+        response = self.moderate(action='restore', ids=[str(spam.pk)])
+        self.assertEqual(response.data['updated'], 0)
+
+    def test_invalidates_each_affected_product_once(self):
+        slugs = [product.slug for product in self.products]
+        with mock.patch('comments.services.product_detail_cache') as detail_cache:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.moderate(action='deactivate', user=str(self.spammer.pk), product=slugs[0])
+        detail_cache.invalidate_on_commit.assert_called_once_with(slugs[0])
+
+    def test_query_count_does_not_depend_on_comment_count(self):
+        def queries_for(**data):
+            with CaptureQueriesContext(connection) as queries:
+                self.moderate(**data)
+            return len(queries)
+
+        one = queries_for(action='deactivate', user=str(self.spammer.pk), product=self.products[0].slug)
+        many = queries_for(action='deactivate', text='good')
+        self.assertEqual(one, many)
+        self.assertEqual(self.ratings(), [0.0, 1.0])
+
+    def test_requires_staff_and_a_selector(self):
+        self.assertEqual(self.moderate(action='deactivate').status_code, 400)
+        self.client.force_authenticate(self.spammer)
+        response = self.moderate(action='deactivate', user=str(self.spammer.pk))
+        self.assertEqual(response.status_code, 403)
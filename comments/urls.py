@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (ProductCommentsListView, CommentCreateView,
                     CommentUpdateView, CommentDeleteView,
-                    AllCommentsListView)
+                    AllCommentsListView, CommentModerationView)
 
 urlpatterns = [
     # Product comments
@@ -11,11 +11,15 @@ urlpatterns = [
          CommentCreateView.as_view(), name='comment-create'),
 
     # Comment CRUD
-    path('comments/<int:id>/update/',
+    path('comments/<uuid:id>/update/',
          CommentUpdateView.as_view(), name='comment-update'),
-    path('comments/<int:id>/delete/',
+    path('comments/<uuid:id>/delete/',
          CommentDeleteView.as_view(), name='comment-delete'),
 
+    # Staff bulk moderation
+    path('comments/moderate/',
+         CommentModerationView.as_view(), name='comment-moderate'),
+
     # All comments
     path('comments/', AllCommentsListView.as_view(), name='all-comments'),
 ]
\ No newline at end of file
@@ -1,20 +1,53 @@
 from rest_framework import generics, permissions, filters, status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from .cache import product_comments_cache
 from .models import *
 from .serializers import *
+from .services import moderate_comments
 from products.models import Product
+from core.pagination import KeysetPagination
 from core.permissions import IsOwnerOrAdmin
+from core.serializers import ValuesListMixin
 
-class ProductCommentsListView(generics.ListAPIView):
+class ProductCommentsListView(ValuesListMixin, generics.ListAPIView):
     serializer_class = CommentSerializer
+    values_serializer_class = CommentValuesSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     ordering_fields = ['rating', 'created_at']
+    ordering = ['-created_at']
+
+    def get_values_queryset(self):
+        # Filtered through the product join, no separate product lookup
+        return Comment.objects.filter(product__slug=self.kwargs['slug'], is_active=True)
 
     def get_queryset(self):
-        product_slug = self.kwargs.get('slug')
-        product = Product.objects.get(slug=product_slug)
-        return Comment.objects.filter(product=product, is_active=True)
+        return self.get_values_queryset().select_related('user', 'product')
+
+    def list(self, request, *args, **kwargs):
+        slug = kwargs['slug']
+        # Only the plain first page is shared between requests
+        cacheable = not set(request.query_params) - {'format'}
+        data = product_comments_cache.get(slug, request) if cacheable else None
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            # An empty page is the only case where the product may not exist
+            if not data['results'] and not Product.objects.filter(slug=slug).exists():
+                raise NotFound(detail='Mahsulot topilmadi')
+            if cacheable:
+                product_comments_cache.set(slug, request, data)
+        return Response(self.set_can_edit(data))
+
+    def set_can_edit(self, data):
+        user = self.request.user
+        user_id = str(user.pk) if user.is_authenticated else None
+        for comment in data['results']:
+            comment['can_edit'] = comment['user']['id'] == user_id or user.is_staff
+        return data
 
 class CommentCreateView(generics.CreateAPIView):
     serializer_class = CommentCreateSerializer
@@ -40,6 +73,22 @@ class CommentDeleteView(generics.DestroyAPIView):
         instance.is_active = False
         instance.save()
 
+class CommentModerationView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = CommentModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        is_active = serializer.validated_data['action'] == 'restore'
+        updated, products = moderate_comments(serializer.get_queryset(), is_active)
+
+        return Response({
+            'message': 'Izohlar yangilandi',
+            'updated': updated,
+            'products': products,
+        })
+
 class AllCommentsListView(generics.ListAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'comments',
     'cart',
     'orders',
+    'recommendations',
 
 ]
 
@@ -159,6 +160,23 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The 'products' alias can be swapped for a shared backend, e.g.
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/var/tmp/shop_cache'
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'products': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'products',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -205,4 +223,46 @@ EMAIL_HOST_USER = 'nazarbeksafarov895@gmail.com'
 EMAIL_HOST_PASSWORD = 'bhud vxkv kddh jkac'
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
-AUTH_USER_MODEL = 'users.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'users.User'
+
+# Product search
+PRODUCT_SEARCH_MAX_RESULTS = 1000
+# 'database' (FTS5 / tsvector) or 'memory' (in-process BM25 index with typo tolerance)
+PRODUCT_SEARCH_ENGINE = 'database'
+PRODUCT_SEARCH_INDEX_SYNC_INTERVAL = 30
+
+# Product detail payload cache. Entries are invalidated by bumping a version
+# in the cache itself, so in production the alias must be shared by all
+# workers (check --deploy warns about locmem)
+PRODUCT_DETAIL_CACHE_ALIAS = 'products'
+PRODUCT_DETAIL_CACHE_TIMEOUT = 600
+# First page of every product's comments, shared between workers as well
+PRODUCT_COMMENTS_CACHE_ALIAS = 'products'
+PRODUCT_COMMENTS_CACHE_TIMEOUT = 300
+
+# Serialized category tree, versioned and rebuilt in the background after every
+# change. Shared between workers like the product cache (check --deploy)
+CATEGORY_TREE_CACHE_ALIAS = 'products'
+CATEGORY_TREE_CACHE_TIMEOUT = 86400
+
+# Upper bounds of the price facet buckets, the last bucket is open ended
+PRODUCT_PRICE_FACET_BOUNDARIES = [50, 100, 500, 1000]
+
+# List endpoints serialize values() rows instead of model instances
+VALUES_LIST_SERIALIZATION = True
+
+# Thumbnails are written next to the originals, e.g. products/abc.small.webp
+THUMBNAIL_SIZES = {'small': 160, 'medium': 480, 'large': 960}
+THUMBNAIL_FORMAT = 'WEBP'
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = 2
+
+# Suggestions per type returned by /products/autocomplete/
+PRODUCT_AUTOCOMPLETE_MAX_RESULTS = 10
+
+# Neighbours kept per product by build_recommendations
+RECOMMENDATIONS_TOP_K = 20
+
+# Product views are buffered per process and flushed every N seconds or N views
+PRODUCT_VIEW_FLUSH_INTERVAL = 10
+PRODUCT_VIEW_FLUSH_SIZE = 1000
@@ -55,6 +55,7 @@ urlpatterns = [
     path('comments/', include('comments.urls')),
     path('cart/', include('cart.urls')),
     path('orders/', include('orders.urls')),
+    path('recommendations/', include('recommendations.urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class VersionedCache:
+    """
+    Base for caches that are invalidated by bumping a version number.
+
+    Data keys embed the current version of their name, so a single ``incr``
+    orphans every entry built on the old one and they expire on their own.
+    Versions are kept without a timeout in the cache ``alias_setting`` names;
+    with several workers it has to be a shared backend, see ``core.checks``.
+    """
+    prefix = None
+    alias_setting = None
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, self.alias_setting, 'default')]
+
+    def _version_key(self, *names):
+        return ':'.join([self.prefix, 'version', *names])
+
+    def version(self, *names):
+        key = self._version_key(*names)
+        version = self.cache.get(key)
+        if version is None:
+            # Start from the clock so an evicted version never revives old entries
+            version = time.time_ns()
+            if not self.cache.add(key, version, timeout=None):
+                version = self.cache.get(key, version)
+        return version
+
+    def bump(self, *names):
+        key = self._version_key(*names)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, time.time_ns(), timeout=None)
+
+    def invalidate(self, *args):
+        raise NotImplementedError
+
+    def invalidate_on_commit(self, *args):
+        # Invalidating before commit would let a concurrent request re-cache old data
+        transaction.on_commit(lambda: self.invalidate(*args))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core import checks
+
+# Backends whose entries live in the memory of a single worker process
+PROCESS_LOCAL_CACHE_BACKENDS = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def shared_cache_check(alias_setting, check_id):
+    """
+    Deploy check for a cache that is invalidated by bumping versions.
+
+    With a process-local backend the bump only reaches the worker that
+    handled the write, the others keep serving their copy until it expires.
+    Register it with ``deploy=True`` so ``manage.py check --deploy`` flags it.
+    """
+    def check(app_configs=None, **kwargs):
+        alias = getattr(settings, alias_setting, 'default')
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend not in PROCESS_LOCAL_CACHE_BACKENDS:
+            return []
+        return [checks.Warning(
+            f"{alias_setting} points to the '{alias}' cache, which is local to each process.",
+            hint="Invalidations would only reach one worker; use a shared backend such as "
+                 "Redis or memcached for this alias.",
+            id=check_id,
+        )]
+    return check
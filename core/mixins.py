@@ -0,0 +1,54 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for GET views.
+
+    ``get_validators()`` returns a ``(fingerprint, last_modified)`` pair,
+    from a cheap query or a cache version. When the client's If-None-Match /
+    If-Modified-Since still match, a 304 is returned before any rows are
+    loaded or serialized. ``last_modified`` should be ``None`` unless every
+    change to the response moves it forward: max(updated_at) over a list
+    doesn't when a row leaves it, so lists rely on the ETag alone.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get_etag(self, fingerprint):
+        request = self.request
+        raw = '|'.join([request.get_full_path(), request.accepted_renderer.format, fingerprint])
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        fingerprint, last_modified = self.get_validators()
+        if fingerprint is None:
+            return super().get(request, *args, **kwargs)
+
+        etag = self.get_etag(fingerprint)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            if timestamp is not None:
+                response.headers['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+def aggregate_fingerprint(*aggregates):
+    """Fold ``{'last_modified': ..., 'count': ...}`` aggregates into validators."""
+    parts = []
+    latest = None
+    for aggregate in aggregates:
+        last_modified = aggregate.get('last_modified')
+        parts.append(f"{aggregate.get('count')}:{last_modified.isoformat() if last_modified else ''}")
+        if last_modified and (latest is None or last_modified > latest):
+            latest = last_modified
+    return ';'.join(parts), latest
@@ -0,0 +1,115 @@
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on ``(ordering field, id)``.
+
+    DRF's CursorPagination positions on the first ordering field and falls
+    back to an OFFSET for duplicate values, which gets expensive on fields
+    like price. Here the cursor carries both the field value and the id, so
+    every page is a single ``WHERE (field, id) > (value, pk) LIMIT n`` range
+    scan no matter how deep it is. Only the first ordering term is used and
+    it must be non-nullable.
+
+    Responses have ``next``/``previous`` links but no ``count`` and no page
+    numbers: a total would cost a COUNT over the whole filtered set on
+    every page. Product list clients that need one can request a facet,
+    e.g. ``?facets=in_stock``, whose two counts add up to it.
+    """
+    ordering = '-created_at'
+    tie_breaker = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_keyset_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        ordering = self.reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = self.select_ordering_columns(queryset).order_by(*ordering)
+        if self.cursor and self.cursor.position is not None:
+            queryset = self.filter_after_position(queryset, ordering, self.cursor.position)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_keyset_ordering(self, request, queryset, view):
+        field = self.get_ordering(request, queryset, view)[0]
+        if field.lstrip('-') in (self.tie_breaker, 'pk'):
+            return (field,)
+        tie_breaker = f'-{self.tie_breaker}' if field.startswith('-') else self.tie_breaker
+        return (field, tie_breaker)
+
+    def select_ordering_columns(self, queryset):
+        # values() rows need the ordering columns to build the cursor
+        fields = getattr(queryset, '_fields', None)
+        if not fields:
+            return queryset
+        missing = [term.lstrip('-') for term in self.ordering if term.lstrip('-') not in fields]
+        return queryset.values(*fields, *missing) if missing else queryset
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        return tuple(term[1:] if term.startswith('-') else f'-{term}' for term in ordering)
+
+    def filter_after_position(self, queryset, ordering, position):
+        try:
+            values = json.loads(position)
+            query = Q()
+            # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+            for index, term in enumerate(ordering):
+                lookup = 'lt' if term.startswith('-') else 'gt'
+                equal = {name.lstrip('-'): value for name, value in zip(ordering[:index], values)}
+                query |= Q(**equal, **{f'{term.lstrip("-")}__{lookup}': values[index]})
+            return queryset.filter(query)
+        except (TypeError, ValueError, IndexError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for term in ordering:
+            name = term.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            if isinstance(value, (datetime.datetime, datetime.date)):
+                value = value.isoformat()
+            elif isinstance(value, (decimal.Decimal, uuid.UUID)):
+                value = str(value)
+            values.append(value)
+        return json.dumps(values, separators=(',', ':'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+class ValuesSerializer:
+    """
+    Read-only list serialization over ``values()`` rows.
+
+    Produces the same output as ``serializer_class`` without instantiating
+    models or walking DRF's per-field machinery. The field plan is compiled
+    once per class: plain fields reuse the DRF serializer's own field
+    instances for formatting, so decimals, datetimes and UUIDs come out
+    exactly as they do through ``serializer_class``; fields listed in
+    ``computed`` are produced by ``get_<name>(row)`` methods.
+    """
+    serializer_class = None
+    columns = ()
+    sources = {}  # output field -> values() column, when they differ
+    computed = ()
+    _plans = {}
+
+    def __init__(self, context=None, prefix=''):
+        # ``prefix`` reads the columns of a nested serializer out of the
+        # parent's rows, e.g. ``user__`` for ``values('user__email', ...)``
+        self.context = context or {}
+        self.request = self.context.get('request')
+        self.prefix = prefix
+        self.plan = self.compile()
+
+    @classmethod
+    def prefixed_columns(cls, prefix):
+        return [f'{prefix}{column}' for column in cls.columns]
+
+    @classmethod
+    def compile(cls):
+        plan = cls._plans.get(cls)
+        if plan is None:
+            plan = []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                getter = f'get_{name}' if name in cls.computed else None
+                if getter is None and isinstance(field, (serializers.BaseSerializer,
+                                                         serializers.SerializerMethodField)):
+                    raise ImproperlyConfigured(
+                        f'{cls.__name__}: {name} needs a get_{name}() in computed')
+                plan.append((name, cls.sources.get(name, name), field.to_representation, getter))
+            cls._plans[cls] = plan
+        return plan
+
+    def annotate(self, queryset):
+        return queryset
+
+    def get_queryset(self, queryset):
+        return self.annotate(queryset).values(*self.columns)
+
+    def prefetch(self, rows):
+        """Bulk-load whatever nested data the page of ``rows`` needs."""
+
+    def serialize(self, rows):
+        rows = list(rows)
+        self.prefetch(rows)
+        return [self.to_representation(row) for row in rows]
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, to_representation, getter in self.plan:
+            if getter is not None:
+                data[name] = getattr(self, getter)(row)
+            else:
+                value = row[self.prefix + column]
+                data[name] = None if value is None else to_representation(value)
+        return data
+
+    def value(self, row, column):
+        return row[self.prefix + column]
+
+    def format(self, name, value):
+        """Format ``value`` the way ``serializer_class`` formats field ``name``."""
+        for field_name, _, to_representation, _ in self.plan:
+            if field_name == name:
+                return None if value is None else to_representation(value)
+        raise KeyError(name)
+
+    def file_url(self, name):
+        # Mirrors rest_framework.fields.FileField.to_representation
+        if not name:
+            return None
+        url = default_storage.url(name)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+
+class ValuesListMixin:
+    """
+    Serves ``list()`` through ``values_serializer_class`` when
+    ``VALUES_LIST_SERIALIZATION`` is enabled (the default).
+
+    Views can override ``get_values_queryset()`` to start from a queryset
+    without the select/prefetch/annotation work the full serializer needs.
+    """
+    values_serializer_class = None
+
+    def get_values_queryset(self):
+        return self.get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'VALUES_LIST_SERIALIZATION', True):
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.values_serializer_class(context=self.get_serializer_context())
+        queryset = serializer.get_queryset(self.filter_queryset(self.get_values_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
@@ -1,5 +1,9 @@
+from django.db.models import Q
 from django.utils.text import slugify
 
+# Characters a "-<counter>" suffix may need
+SLUG_SUFFIX_ROOM = 11
+
 
 def generate_slug(title, model_class):
 
@@ -14,6 +18,41 @@ def generate_slug(title, model_class):
     return slug
 
 
+def allocate_unique_slugs(titles, model_class, field='slug', reserved=()):
+    """
+    Slugs for a whole batch of titles with a single prefix lookup.
+
+    Follows the same ``title``, ``title-1``, ``title-2`` scheme as
+    ``generate_slug`` but resolves collisions in memory, both against
+    existing rows and within the batch. Bases are cut short where needed so
+    that slug and suffix fit the field's ``max_length``. ``reserved`` slugs
+    are treated as taken.
+    """
+    max_length = model_class._meta.get_field(field).max_length
+    # An empty base would turn the prefix lookup into a full table read
+    bases = [(slugify(title) or model_class._meta.model_name)[:max_length] for title in titles]
+    prefixes = Q()
+    for base in set(bases):
+        # Shortened enough to also match the truncated, suffixed variants
+        prefixes |= Q(**{f'{field}__startswith': base[:max_length - SLUG_SUFFIX_ROOM]})
+    taken = set(reserved)
+    taken.update(model_class.objects.filter(prefixes).values_list(field, flat=True))
+
+    slugs = []
+    counters = {}
+    for base in bases:
+        slug = base
+        counter = counters.get(base, 1)
+        while slug in taken:
+            suffix = f"-{counter}"
+            slug = f"{base[:max_length - len(suffix)]}{suffix}"
+            counter += 1
+        counters[base] = counter
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
 def calculate_cart_total(cart_items):
 
     return sum(item.total_price for item in cart_items)
\ No newline at end of file
@@ -11,6 +11,8 @@ ORDER_STATUS = (
     ('delivered', 'Yetkazilgan'),
     ('cancelled', 'Bekor qilingan'),
 )
+CANCELLABLE_STATUSES = ('new', 'paid')
+COMPLETED_STATUS = 'delivered'
 
 class Order(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
@@ -22,17 +24,21 @@ class Order(BaseModel):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['status'], name='order_status_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
 
     @property
     def can_cancel(self):
-        return self.status in ['new', 'paid']
+        return self.status in CANCELLABLE_STATUSES
 
     @property
     def is_completed(self):
-        return self.status == 'delivered'
+        return self.status == COMPLETED_STATUS
 
 class OrderItem(BaseModel):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -1,7 +1,10 @@
+from collections import defaultdict
+
 from rest_framework import serializers
-from .models import Order, OrderItem
-from products.serializers import ProductSerializer
-from users.serializers import UserProfileSerializer
+from .models import Order, OrderItem, ORDER_STATUS, CANCELLABLE_STATUSES, COMPLETED_STATUS
+from core.serializers import ValuesSerializer
+from products.serializers import ProductSerializer, ProductValuesSerializer
+from users.serializers import UserProfileSerializer, UserProfileValuesSerializer
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
@@ -25,6 +28,61 @@ class OrderSerializer(serializers.ModelSerializer):
                  'can_cancel', 'is_completed', 'created_at', 'updated_at']
         read_only_fields = ['user', 'total_price', 'created_at', 'updated_at']
 
+class OrderItemValuesSerializer(ValuesSerializer):
+    serializer_class = OrderItemSerializer
+    columns = ['id', 'order_id', 'product_id', 'price', 'quantity']
+    computed = ('product', 'total_price')
+
+    def prefetch(self, rows):
+        products = ProductValuesSerializer(self.context)
+        self.products = products.serialize_ids(
+            row['product_id'] for row in rows if row['product_id'] is not None
+        )
+
+    def get_product(self, row):
+        return self.products.get(row['product_id'])
+
+    def get_total_price(self, row):
+        return self.format('total_price', row['price'] * row['quantity'])
+
+
+class OrderValuesSerializer(ValuesSerializer):
+    serializer_class = OrderSerializer
+    columns = ['id', 'user_id', 'total_price', 'status', 'shipping_address',
+               'phone_number', 'notes', 'created_at', 'updated_at',
+               *UserProfileValuesSerializer.prefixed_columns('user__')]
+    computed = ('user', 'status_display', 'items', 'can_cancel', 'is_completed')
+    status_labels = dict(ORDER_STATUS)
+
+    def __init__(self, context=None, prefix=''):
+        super().__init__(context, prefix)
+        self.user_serializer = UserProfileValuesSerializer(self.context, prefix='user__')
+
+    def prefetch(self, rows):
+        items = OrderItemValuesSerializer(self.context)
+        item_rows = list(items.get_queryset(
+            OrderItem.objects.filter(order_id__in=[row['id'] for row in rows])
+        ))
+        self.items = defaultdict(list)
+        for row, data in zip(item_rows, items.serialize(item_rows)):
+            self.items[row['order_id']].append(data)
+
+    def get_user(self, row):
+        return self.user_serializer.to_representation(row)
+
+    def get_status_display(self, row):
+        return self.status_labels.get(row['status'], row['status'])
+
+    def get_items(self, row):
+        return self.items[row['id']]
+
+    def get_can_cancel(self, row):
+        return row['status'] in CANCELLABLE_STATUSES
+
+    def get_is_completed(self, row):
+        return row['status'] == COMPLETED_STATUS
+
+
 class CreateOrderSerializer(serializers.Serializer):
     shipping_address = serializers.CharField(required=False)
     phone_number = serializers.CharField(required=False)
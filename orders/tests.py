@@ -1,3 +1,43 @@
-from django.test import TestCase
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from categories.models import Category
+from products.models import Product, ProductImage
+from users.models import User
+from .models import Order, OrderItem
+
+
+class OrderListValuesSerializationTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Phones')
+        products = [
+            Product.objects.create(title=f'Phone {i}', description='Smartphone',
+                                   price=100 + i, quantity=5, category=category)
+            for i in range(2)
+        ]
+        ProductImage.objects.create(product=products[0], image='products/0.jpg', is_main=True)
+        cls.user = User.objects.create(username='buyer', password='x')
+        cls.staff = User.objects.create(username='staff', password='x', is_staff=True)
+        for status in ('new', 'delivered'):
+            order = Order.objects.create(user=cls.user, total_price='301.00', status=status)
+            OrderItem.objects.create(order=order, product=products[0], price='100.00', quantity=1)
+            OrderItem.objects.create(order=order, product=products[1], price='100.50', quantity=2)
+            OrderItem.objects.create(order=order, product=None, price='0.50', quantity=1)
+
+    def assertSameJson(self, user):
+        self.client.force_authenticate(user)
+        fast = self.client.get(reverse('order-list'))
+        with override_settings(VALUES_LIST_SERIALIZATION=False):
+            slow = self.client.get(reverse('order-list'))
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_values_rows_render_identical_json(self):
+        response = self.assertSameJson(self.user)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results'][0]['items']), 3)
+        self.assertSameJson(self.staff)
@@ -3,10 +3,11 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from .models import Order
-from .serializers import (OrderSerializer, CreateOrderSerializer,
+from .serializers import (OrderSerializer, OrderValuesSerializer, CreateOrderSerializer,
                           UpdateOrderStatusSerializer)
 from .services import create_order_from_cart
 from core.permissions import IsAdminOrReadOnly, IsOwnerOrAdmin
+from core.serializers import ValuesListMixin
 
 
 class CreateOrderView(APIView):
@@ -35,8 +36,9 @@ class CreateOrderView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(ValuesListMixin, generics.ListAPIView):
     serializer_class = OrderSerializer
+    values_serializer_class = OrderValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from core.checks import shared_cache_check
+
+        checks.register(shared_cache_check('PRODUCT_DETAIL_CACHE_ALIAS', 'products.W001'),
+                        checks.Tags.caches, deploy=True)
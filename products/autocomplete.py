@@ -0,0 +1,185 @@
+import heapq
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .search import tokenize
+from .search_index import SyncedIndex
+
+PRODUCT, CATEGORY = 'product', 'category'
+RESULT_KEYS = {PRODUCT: 'products', CATEGORY: 'categories'}
+# Entries indexed per item: the full title plus the title from each later word
+MAX_WORDS = 8
+MAX_LIMIT = 20
+# Prefixes matching more entries than this keep a ranked top list that saves
+# patch in place, so one-letter queries don't rescan a third of the index
+CACHE_THRESHOLD = 256
+CACHE_DEPTH = 2 * MAX_LIMIT
+MAX_CACHED_PREFIXES = 4096
+
+
+def max_results():
+    return getattr(settings, 'PRODUCT_AUTOCOMPLETE_MAX_RESULTS', 10)
+
+
+def normalize(text):
+    return ' '.join(tokenize(text))
+
+
+class AutocompleteIndex(SyncedIndex):
+    """Sorted array of ``(phrase, kind, id)`` entries searched with bisect.
+
+    Every active product and category is indexed under its title and under
+    each word-boundary suffix of it, so "iph" suggests "Apple iPhone 15".
+    Kept current like the search index, see ``SyncedIndex``.
+    """
+
+    def _reset(self):
+        self._entries = []
+        self._items = {}  # (kind, id) -> (title, slug, rating, phrases)
+        self._top = {}  # prefix -> {kind: [[(rank key, id), ...], complete]}
+
+    def _load(self):
+        from categories.models import Category
+        from .models import Product
+
+        entries = []
+        products = Product.objects.filter(is_active=True).values_list('id', 'title', 'slug', 'rating')
+        for pk, title, slug, rating in products.iterator(chunk_size=5000):
+            entries.extend(self._register(PRODUCT, pk, title, slug, rating))
+        categories = Category.objects.filter(is_active=True).values_list('id', 'title', 'slug')
+        for pk, title, slug in categories.iterator(chunk_size=5000):
+            entries.extend(self._register(CATEGORY, pk, title, slug, 0.0))
+        # One sort instead of an insort per entry
+        entries.sort()
+        self._entries = entries
+        self._warm()
+
+    def _catch_up(self, since):
+        from categories.models import Category
+        from .models import Product
+
+        self._update_products(Product.objects.filter(updated_at__gte=since))
+        self._update_categories(Category.objects.filter(updated_at__gte=since))
+
+    def update_products(self, products):
+        if not self._built:
+            return
+        with self._lock:
+            self._update_products(products)
+
+    def update_categories(self, categories):
+        if not self._built:
+            return
+        with self._lock:
+            self._update_categories(categories)
+
+    def remove(self, kind, ids):
+        if not self._built:
+            return
+        with self._lock:
+            for pk in ids:
+                self._replace(kind, pk, None)
+
+    def _update_products(self, products):
+        for product in products:
+            item = (product.title, product.slug, product.rating) if product.is_active else None
+            self._replace(PRODUCT, product.id, item)
+
+    def _update_categories(self, categories):
+        for category in categories:
+            item = (category.title, category.slug, 0.0) if category.is_active else None
+            self._replace(CATEGORY, category.id, item)
+
+    def _register(self, kind, pk, title, slug, rating):
+        words = tokenize(title)[:MAX_WORDS]
+        phrases = list(dict.fromkeys(' '.join(words[i:]) for i in range(len(words))))
+        self._items[(kind, pk)] = (title, slug, rating, phrases)
+        return [(phrase, kind, pk) for phrase in phrases]
+
+    def _rank_key(self, kind, pk, prefix):
+        title, _, rating, phrases = self._items[(kind, pk)]
+        # Matches at the start of the title beat matches inside it
+        return (not phrases[0].startswith(prefix), -rating, title, pk)
+
+    def _replace(self, kind, pk, item):
+        old = self._items.pop((kind, pk), None)
+        phrases = list(old[3]) if old else []
+        if old:
+            for phrase in old[3]:
+                position = bisect_left(self._entries, (phrase, kind, pk))
+                if position < len(self._entries) and self._entries[position] == (phrase, kind, pk):
+                    del self._entries[position]
+        new_phrases = []
+        if item is not None:
+            for entry in self._register(kind, pk, *item):
+                insort(self._entries, entry)
+                new_phrases.append(entry[0])
+        if self._top:
+            self._patch_top(kind, pk, phrases + new_phrases, new_phrases)
+
+    def _patch_top(self, kind, pk, phrases, new_phrases):
+        prefixes = {phrase[:length] for phrase in phrases for length in range(1, len(phrase) + 1)}
+        for prefix in prefixes & self._top.keys():
+            slot = self._top[prefix][kind]
+            rows, complete = slot
+            rows[:] = [row for row in rows if row[1] != pk]
+            if any(phrase.startswith(prefix) for phrase in new_phrases):
+                key = self._rank_key(kind, pk, prefix)
+                # Past the end of a truncated list there may be better unseen entries
+                if complete or (rows and key < rows[-1][0]):
+                    insort(rows, (key, pk))
+                    if len(rows) > CACHE_DEPTH:
+                        rows.pop()
+                        slot[1] = False
+            if not slot[1] and len(rows) < MAX_LIMIT:
+                del self._top[prefix]
+
+    def _rank(self, prefix, start, end):
+        best = {PRODUCT: set(), CATEGORY: set()}
+        for _, kind, pk in self._entries[start:end]:
+            best[kind].add(pk)
+        ranked = {}
+        for kind, ids in best.items():
+            rows = heapq.nsmallest(CACHE_DEPTH, ((self._rank_key(kind, pk, prefix), pk) for pk in ids))
+            ranked[kind] = [rows, len(ids) <= CACHE_DEPTH]
+        return ranked
+
+    def _warm(self, depth=2):
+        # The widest ranges are the shortest prefixes, rank them up front
+        prefixes = {phrase[:depth] for phrase, _, _ in self._entries}
+        prefixes |= {prefix[:1] for prefix in prefixes}
+        for prefix in sorted(prefixes):
+            start = bisect_left(self._entries, (prefix,))
+            end = bisect_left(self._entries, (prefix + '\uffff',))
+            if end - start > CACHE_THRESHOLD and len(self._top) < MAX_CACHED_PREFIXES:
+                self._top[prefix] = self._rank(prefix, start, end)
+
+    def suggest(self, query, limit=None):
+        """``{'products': [...], 'categories': [...]}`` whose titles match ``query`` as a prefix."""
+        limit = min(limit or max_results(), MAX_LIMIT)
+        prefix = normalize(query)
+        if not prefix:
+            return {'products': [], 'categories': []}
+        self.ensure_ready()
+        with self._lock:
+            ranked = self._top.get(prefix)
+            if ranked is None:
+                start = bisect_left(self._entries, (prefix,))
+                end = bisect_left(self._entries, (prefix + '\uffff',))
+                ranked = self._rank(prefix, start, end)
+                if end - start > CACHE_THRESHOLD:
+                    if len(self._top) >= MAX_CACHED_PREFIXES:
+                        del self._top[next(iter(self._top))]
+                    self._top[prefix] = ranked
+            return {
+                RESULT_KEYS[kind]: [self._suggestion(kind, pk) for _, pk in rows[:limit]]
+                for kind, (rows, _) in ranked.items()
+            }
+
+    def _suggestion(self, kind, pk):
+        title, slug, _, _ = self._items[(kind, pk)]
+        return {'title': title, 'slug': slug}
+
+
+autocomplete_index = AutocompleteIndex()
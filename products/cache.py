@@ -0,0 +1,77 @@
+from django.conf import settings
+
+from core.cache import VersionedCache
+
+
+class ProductDetailCache(VersionedCache):
+    """
+    Serialized ProductDetailView payloads keyed by slug.
+
+    Payloads contain absolute image URLs, so entries are also keyed by the
+    request's scheme and host. Each slug has its own version, and bumping it
+    drops the entries for every host at once.
+    """
+    prefix = 'product-detail'
+    alias_setting = 'PRODUCT_DETAIL_CACHE_ALIAS'
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'PRODUCT_DETAIL_CACHE_TIMEOUT', 600)
+
+    def _data_key(self, slug, version, request):
+        return f'{self.prefix}:{slug}:{version}:{request.scheme}://{request.get_host()}'
+
+    def _count(self, name):
+        key = f'{self.prefix}:stats:{name}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 1, timeout=None)
+
+    def get(self, slug, request):
+        data = self.cache.get(self._data_key(slug, self.version(slug), request))
+        self._count('hits' if data is not None else 'misses')
+        return data
+
+    def set(self, slug, request, data):
+        self.cache.set(self._data_key(slug, self.version(slug), request), data, self.timeout)
+
+    def invalidate(self, *slugs):
+        for slug in slugs:
+            self.bump(slug)
+        if slugs:
+            # Lists embed the same fields
+            product_list_version.invalidate()
+
+    def stats(self):
+        values = self.cache.get_many([f'{self.prefix}:stats:hits', f'{self.prefix}:stats:misses'])
+        hits = values.get(f'{self.prefix}:stats:hits', 0)
+        misses = values.get(f'{self.prefix}:stats:misses', 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+
+    def reset_stats(self):
+        self.cache.delete_many([f'{self.prefix}:stats:hits', f'{self.prefix}:stats:misses'])
+
+
+class ProductListVersion(VersionedCache):
+    """
+    Change marker for product lists, the ETag fingerprint of ProductListView.
+
+    Bumped along with every product detail invalidation, on category saves
+    (tree filters) and by bulk imports. View count flushes bump the separate
+    ``views`` version, which only lists ordered by views depend on.
+    """
+    prefix = 'product-list'
+    alias_setting = 'PRODUCT_DETAIL_CACHE_ALIAS'
+
+    def invalidate(self, *names):
+        self.bump(*names)
+
+
+product_detail_cache = ProductDetailCache()
+product_list_version = ProductListVersion()
@@ -0,0 +1,121 @@
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .cache import product_list_version
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounterBuffer:
+    """Per-process buffer of product views, written back in batches.
+
+    ``increment()`` only touches a dict under a lock. Pending counts are
+    flushed from a background thread every ``flush_interval`` seconds or as
+    soon as ``max_pending`` views have accumulated, and once more at
+    interpreter exit.
+
+    A flush issues one ``UPDATE ... SET view_count = view_count + n`` per
+    distinct ``n``, so most batches are a single statement. Counts of a
+    failed flush go back into the buffer.
+    """
+
+    def __init__(self, flush_interval=None, max_pending=None):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counts = Counter()
+        self._pending = 0
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def get_flush_interval(self):
+        if self.flush_interval is not None:
+            return self.flush_interval
+        return getattr(settings, 'PRODUCT_VIEW_FLUSH_INTERVAL', 10)
+
+    def get_max_pending(self):
+        if self.max_pending is not None:
+            return self.max_pending
+        return getattr(settings, 'PRODUCT_VIEW_FLUSH_SIZE', 1000)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def increment(self, product_id, count=1):
+        with self._lock:
+            self._counts[product_id] += count
+            self._pending += count
+            if self._thread is None:
+                self._start()
+            if self._pending >= self.get_max_pending():
+                self._wake.set()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='product-view-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.get_flush_interval())
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.flush()
+            except Exception:
+                # The counts are back in the buffer and retried on the next tick
+                logger.exception('Product view flush failed')
+            finally:
+                # This thread's connection would otherwise stay open between flushes
+                connection.close()
+
+    def flush(self):
+        """Write pending counts; returns the number of views written."""
+        from .models import Product
+
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, Counter()
+                self._pending = 0
+            if not counts:
+                return 0
+
+            by_increment = defaultdict(list)
+            for product_id, count in counts.items():
+                by_increment[count].append(product_id)
+            try:
+                # update() leaves updated_at alone, so caches and ETags keyed on it stay valid
+                with transaction.atomic():
+                    for increment, product_ids in by_increment.items():
+                        Product.objects.filter(id__in=product_ids).update(
+                            view_count=F('view_count') + increment
+                        )
+            except Exception:
+                with self._lock:
+                    self._counts.update(counts)
+                    self._pending += sum(counts.values())
+                    pending = self._pending
+                logger.warning('Re-buffered %d views of %d products, %d views pending',
+                               sum(counts.values()), len(counts), pending)
+                raise
+            # Lists ordered by views change all the same
+            product_list_version.invalidate('views')
+            return sum(counts.values())
+
+    def shutdown(self):
+        self._stopped.set()
+        self._wake.set()
+        self.flush()
+
+
+view_counter = ViewCounterBuffer()
@@ -0,0 +1,73 @@
+import csv
+import json
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef, Subquery
+
+from .models import Product, ProductImage
+
+EXPORT_FIELDS = ['id', 'title', 'slug', 'description', 'price', 'quantity',
+                 'rating', 'total_ratings', 'category_id', 'category_title',
+                 'category_slug', 'main_image', 'created_at', 'updated_at']
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object that hands back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset():
+    main_image = ProductImage.objects.filter(
+        product=OuterRef('pk'), is_main=True
+    ).order_by('created_at').values('image')[:1]
+    return Product.objects.filter(is_active=True).annotate(
+        main_image_name=Subquery(main_image),
+    ).values(
+        'id', 'title', 'slug', 'description', 'price', 'quantity', 'rating',
+        'total_ratings', 'category_id', 'category__title', 'category__slug',
+        'main_image_name', 'created_at', 'updated_at',
+    ).order_by('created_at', 'id')
+
+
+def iter_rows(chunk_size=CHUNK_SIZE):
+    # iterator() streams with a server-side cursor where the backend has one
+    for row in export_queryset().iterator(chunk_size=chunk_size):
+        image = row['main_image_name']
+        row['category_title'] = row['category__title']
+        row['category_slug'] = row['category__slug']
+        row['main_image'] = default_storage.url(image) if image else None
+        yield {field: row[field] for field in EXPORT_FIELDS}
+
+
+def _batched(lines, size):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def stream_ndjson(chunk_size=CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    lines = (encoder.encode(row) + '\n' for row in iter_rows(chunk_size))
+    return _batched(lines, 500)
+
+
+def stream_csv(chunk_size=CHUNK_SIZE):
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in iter_rows(chunk_size):
+            row['created_at'] = row['created_at'].isoformat()
+            row['updated_at'] = row['updated_at'].isoformat()
+            yield writer.writerow(row.values())
+
+    return _batched(lines(), 500)
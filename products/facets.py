@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+FACET_NAMES = ('category', 'price', 'in_stock')
+
+
+def price_buckets():
+    boundaries = [Decimal(str(b)) for b in getattr(
+        settings, 'PRODUCT_PRICE_FACET_BOUNDARIES', [50, 100, 500, 1000])]
+    lower = [Decimal('0')] + boundaries
+    upper = boundaries + [None]
+    return list(zip(lower, upper))
+
+
+def _format_price(value):
+    # Same shape as the serializers' DecimalField output
+    return None if value is None else str(value.quantize(Decimal('0.01')))
+
+
+def parse_facets(value):
+    """``facets=true`` or ``facets=all`` selects every facet, otherwise a comma list."""
+    if not value:
+        return []
+    if value.lower() in ('1', 'true', 'all'):
+        return list(FACET_NAMES)
+    return [name for name in FACET_NAMES if name in value.split(',')]
+
+
+def compute_facets(queryset, names):
+    """
+    Category, price bucket and stock counts for ``queryset`` in one query.
+
+    Rows are grouped by category and every price bucket / stock state is a
+    filtered COUNT in the same SELECT; the other facets are sums over the
+    category groups.
+    """
+    buckets = price_buckets()
+    annotations = {'total': Count('id')}
+    for index, (low, high) in enumerate(buckets):
+        condition = Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        annotations[f'price_{index}'] = Count('id', filter=condition)
+    annotations['in_stock'] = Count('id', filter=Q(quantity__gt=0))
+
+    rows = list(
+        queryset.order_by()
+        .values('category_id', 'category__title', 'category__slug')
+        .annotate(**annotations)
+        .order_by('-total', 'category__title')
+    )
+
+    facets = {}
+    if 'category' in names:
+        facets['category'] = [{
+            'id': row['category_id'],
+            'title': row['category__title'],
+            'slug': row['category__slug'],
+            'count': row['total'],
+        } for row in rows]
+    if 'price' in names:
+        facets['price'] = [{
+            'min': _format_price(low),
+            'max': _format_price(high),
+            'count': sum(row[f'price_{index}'] for row in rows),
+        } for index, (low, high) in enumerate(buckets)]
+    if 'in_stock' in names:
+        in_stock = sum(row['in_stock'] for row in rows)
+        facets['in_stock'] = {
+            'true': in_stock,
+            'false': sum(row['total'] for row in rows) - in_stock,
+        }
+    return facets
+
+
+class FacetedListMixin:
+    """Adds ``facets`` counts next to list results when ``?facets=`` is given.
+
+    Views provide ``get_base_queryset()``: the queryset with the request's
+    own filters applied, without serializer annotations. The filter backends
+    run on top of it.
+    """
+
+    def get_base_queryset(self):
+        return self.get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        names = parse_facets(request.query_params.get('facets'))
+        if names:
+            queryset = self.filter_queryset(self.get_base_queryset())
+            response.data['facets'] = compute_facets(queryset, names)
+        return response
@@ -0,0 +1,197 @@
+import csv
+import json
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+
+from categories.models import Category
+from core.utils import allocate_unique_slugs
+from . import search
+from .cache import product_list_version
+from .models import Product
+from .search_index import index
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off'}
+MAX_PRICE = Decimal('99999999.99')
+
+
+def read_rows(path, file_format=None):
+    """Yield raw rows one at a time from a CSV or NDJSON file."""
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    with open(path, newline='', encoding='utf-8') as stream:
+        if file_format == 'csv':
+            yield from csv.DictReader(stream)
+        else:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        yield {'__error__': f"JSON xato: {e}"}
+
+
+def clean_row(raw):
+    """
+    Validate one raw row without touching the database.
+
+    Returns ``(data, errors)``; the category reference is resolved later in
+    the main process.
+    """
+    if not isinstance(raw, dict):
+        return None, ["Qator obyekt bo'lishi kerak"]
+    if '__error__' in raw:
+        return None, [raw['__error__']]
+
+    errors = []
+    data = {}
+
+    title = str(raw.get('title') or '').strip()
+    if not title:
+        errors.append("title kerak")
+    elif len(title) > 255:
+        errors.append("title 255 belgidan oshmasligi kerak")
+    data['title'] = title
+
+    description = str(raw.get('description') or '').strip()
+    if not description:
+        errors.append("description kerak")
+    data['description'] = description
+
+    try:
+        price = Decimal(str(raw.get('price'))).quantize(Decimal('0.01'))
+        if price < 0 or price > MAX_PRICE:
+            errors.append("price 0 dan kichik yoki juda katta")
+        data['price'] = price
+    except (InvalidOperation, ValueError):
+        errors.append("price son bo'lishi kerak")
+
+    quantity = raw.get('quantity')
+    try:
+        quantity = int(quantity) if quantity not in (None, '') else 0
+        if quantity < 0:
+            errors.append("quantity 0 dan kichik bo'lmasligi kerak")
+        data['quantity'] = quantity
+    except (TypeError, ValueError):
+        errors.append("quantity butun son bo'lishi kerak")
+
+    is_active = raw.get('is_active', True)
+    if isinstance(is_active, str):
+        value = is_active.strip().lower()
+        if value in ('', *TRUE_VALUES):
+            is_active = True
+        elif value in FALSE_VALUES:
+            is_active = False
+        else:
+            errors.append("is_active true yoki false bo'lishi kerak")
+    data['is_active'] = bool(is_active)
+
+    category = str(raw.get('category') or raw.get('category_id') or '').strip()
+    if not category:
+        errors.append("category kerak")
+    data['category'] = category
+
+    return (None if errors else data), errors
+
+
+def clean_chunk(rows):
+    return [clean_row(raw) for raw in rows]
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class ProductImporter:
+    """
+    Streams rows into ``Product`` with ``bulk_create``.
+
+    Each batch gets its slugs from one prefix lookup (``allocate_unique_slugs``)
+    and is inserted in its own transaction together with its search index
+    rows. With ``workers > 1`` parsing and validation run in a process pool.
+    """
+
+    def __init__(self, batch_size=500, workers=1, dry_run=False):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.created = 0
+        self.errors = []
+        self.categories = {}
+        for category in Category.objects.filter(is_active=True):
+            self.categories[str(category.id)] = category
+            self.categories[category.slug] = category
+
+    def run(self, rows):
+        chunks = chunked(rows, self.batch_size)
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = self._parallel(pool, chunks)
+                for row_number, cleaned in self._numbered(results):
+                    self._import_batch(row_number, cleaned)
+        else:
+            for row_number, cleaned in self._numbered(map(clean_chunk, chunks)):
+                self._import_batch(row_number, cleaned)
+        return self.created
+
+    def _parallel(self, pool, chunks):
+        # Executor.map() would read the whole file up front, keep a bounded window
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(clean_chunk, chunk))
+            if len(pending) >= self.workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _numbered(self, results):
+        row_number = 1
+        for cleaned in results:
+            yield row_number, cleaned
+            row_number += len(cleaned)
+
+    def _import_batch(self, first_row, cleaned):
+        products = []
+        for offset, (data, errors) in enumerate(cleaned):
+            row_number = first_row + offset
+            if errors:
+                self.errors.append((row_number, errors))
+                continue
+            category = self.categories.get(data.pop('category'))
+            if category is None:
+                self.errors.append((row_number, ["category topilmadi"]))
+                continue
+            products.append(Product(category=category, **data))
+
+        if not products:
+            return
+        if self.dry_run:
+            self.created += len(products)
+            return
+        try:
+            self._insert(products)
+        except IntegrityError:
+            # Another writer took one of the slugs in the meantime, allocate again
+            for product in products:
+                product.slug = ''
+            self._insert(products)
+        self.created += len(products)
+
+    def _insert(self, products):
+        slugs = allocate_unique_slugs([p.title for p in products], Product,
+                                      reserved=Product.RESERVED_SLUGS)
+        for product, slug in zip(products, slugs):
+            product.slug = slug
+        with transaction.atomic():
+            Product.objects.bulk_create(products, batch_size=self.batch_size)
+            # bulk_create skips save() and its signals
+            Category.objects.add_product_counts(Counter(p.category_id for p in products if p.is_active))
+            search.index_products(products)
+            transaction.on_commit(lambda: index.update(products))
+            product_list_version.invalidate_on_commit()
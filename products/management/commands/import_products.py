@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import ProductImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "CSV yoki NDJSON fayldan mahsulotlarni bulk_create bilan import qilish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV yoki NDJSON fayl")
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'ndjson'],
+                            help="Fayl formati (default: kengaytmadan aniqlanadi)")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Parsing va validatsiya uchun process pool hajmi")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Faqat validatsiya, bazaga yozmaslik")
+        parser.add_argument('--max-errors', type=int, default=20,
+                            help="Ko'rsatiladigan xatolar soni")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError("--batch-size va --workers musbat bo'lishi kerak")
+
+        importer = ProductImporter(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            dry_run=options['dry_run'],
+        )
+        try:
+            rows = read_rows(options['path'], options['file_format'])
+            created = importer.run(rows)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for row_number, errors in importer.errors[:options['max_errors']]:
+            self.stderr.write(f"{row_number}-qator: {'; '.join(errors)}")
+
+        verb = "validatsiyadan o'tdi" if options['dry_run'] else "import qilindi"
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} ta mahsulot {verb}, {len(importer.errors)} ta qator xato"
+        ))
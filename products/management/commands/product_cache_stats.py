@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import product_detail_cache
+
+
+class Command(BaseCommand):
+    help = "Product detail cache hit/miss counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Counters ni nolga tushirish")
+
+    def handle(self, *args, **options):
+        stats = product_detail_cache.stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_ratio={stats['hit_ratio']}"
+        )
+        if options['reset']:
+            product_detail_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
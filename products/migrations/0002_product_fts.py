@@ -0,0 +1,78 @@
+# Generated by Django 4.2 on 2026-10-18 10:12
+
+from django.db import migrations
+
+# A snapshot of products.search as of this migration; later changes to that
+# module must not alter what running this migration does
+
+SQLITE_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_product_fts USING fts5("
+    "product_id UNINDEXED, title, description, category, "
+    "tokenize='unicode61 remove_diacritics 2')",
+)
+POSTGRES_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS products_product_fts ("
+    "product_id uuid PRIMARY KEY REFERENCES products_product (id) "
+    "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS products_product_fts_document_gin "
+    "ON products_product_fts USING GIN (document)",
+)
+POSTGRES_BACKFILL = (
+    "INSERT INTO products_product_fts (product_id, document) "
+    "SELECT p.id, "
+    "setweight(to_tsvector('simple', p.title), 'A') || "
+    "setweight(to_tsvector('simple', p.description), 'B') || "
+    "setweight(to_tsvector('simple', c.title), 'C') "
+    "FROM products_product p JOIN categories_category c ON c.id = p.category_id "
+    "WHERE p.is_active"
+)
+SQLITE_INSERT = (
+    "INSERT OR REPLACE INTO products_product_fts "
+    "(rowid, product_id, title, description, category) VALUES (%s, %s, %s, %s, %s)"
+)
+
+
+def create_fts_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor not in ('sqlite', 'postgresql'):
+        return
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            for statement in POSTGRES_SCHEMA:
+                cursor.execute(statement)
+            cursor.execute(POSTGRES_BACKFILL)
+            return
+
+        for statement in SQLITE_SCHEMA:
+            cursor.execute(statement)
+        # FTS5 rowids are the top 63 bits of the product UUID, which SQL
+        # can't compute from the stored hex
+        Product = apps.get_model('products', 'Product')
+        rows = Product.objects.filter(is_active=True).values_list(
+            'id', 'title', 'description', 'category__title')
+        batch = []
+        for pk, title, description, category in rows.iterator(chunk_size=1000):
+            batch.append((pk.int >> 65, pk.hex, title, description, category))
+            if len(batch) >= 1000:
+                cursor.executemany(SQLITE_INSERT, batch)
+                batch = []
+        if batch:
+            cursor.executemany(SQLITE_INSERT, batch)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS products_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 10:46
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+
+def populate_ratings(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Comment = apps.get_model('comments', 'Comment')
+    comments = Comment.objects.filter(product=OuterRef('pk'), is_active=True).order_by().values('product')
+    Product.objects.update(
+        rating_sum=Coalesce(Subquery(comments.annotate(total=Sum('rating')).values('total')), 0),
+        total_ratings=Coalesce(Subquery(comments.annotate(count=Count('id')).values('count')), 0),
+    )
+    Product.objects.update(rating=Coalesce(
+        Round(Cast(F('rating_sum'), FloatField()) / NullIf(F('total_ratings'), Value(0)), 1),
+        Value(0.0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_view_count'),
+        ('comments', '0003_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-18 10:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_distribution(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Comment = apps.get_model('comments', 'Comment')
+    counts = {}
+    for star in range(1, 6):
+        comments = Comment.objects.filter(product=OuterRef('pk'), is_active=True, rating=star)
+        counts[f'rating_{star}'] = Coalesce(Subquery(
+            comments.order_by().values('product').annotate(count=Count('id')).values('count')), 0)
+    Product.objects.update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_distribution, migrations.RunPython.noop),
+    ]
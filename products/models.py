@@ -1,9 +1,64 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Now, Round
 from django.core.validators import MinValueValidator
 from shared.models import BaseModel
 from categories.models import Category
+from categories.paths import subtree_range
 from django.utils.text import slugify
 
+def rating_expression(rating_sum, total_ratings):
+    # Average rounded to one decimal, 0 without ratings
+    return Coalesce(
+        Round(Cast(rating_sum, FloatField()) / NullIf(total_ratings, Value(0)), 1),
+        Value(0.0),
+    )
+
+
+RATING_STARS = range(1, 6)
+
+
+class ProductQuerySet(models.QuerySet):
+
+    def with_comment_counts(self):
+        # A correlated subquery rather than a JOIN + GROUP BY, so
+        # ORDER BY ... LIMIT can still walk the listing indexes
+        Comment = self.model._meta.get_field('comments').related_model
+        comments = Comment.objects.filter(
+            product=OuterRef('pk'), is_active=True
+        ).order_by().values('product').annotate(count=Count('id')).values('count')
+        return self.annotate(active_comments_count=Coalesce(Subquery(comments), 0))
+
+    def in_category_tree(self, category):
+        # Products of the category and its descendants, skipping branches
+        # under a soft-deleted category
+        lower, upper = subtree_range(category.path)
+        hidden = Category.objects.hidden_ancestor_of(OuterRef('category__path'), within=category)
+        return self.filter(category__path__gte=lower, category__path__lt=upper).filter(~Exists(hidden))
+
+    def add_ratings(self, deltas):
+        # {product_id: {column: delta}} over rating_sum, total_ratings and the
+        # per-star counts. The average is derived in the same UPDATE, from
+        # the incremented columns
+        for pk, columns in deltas.items():
+            columns = {column: delta for column, delta in columns.items() if delta}
+            if not columns:
+                continue
+            updates = {column: F(column) + delta for column, delta in columns.items()}
+            self.filter(pk=pk).update(
+                **updates,
+                rating=rating_expression(updates.get('rating_sum', F('rating_sum')),
+                                         updates.get('total_ratings', F('total_ratings'))),
+                updated_at=Now(),
+            )
+
+    def with_details(self):
+        # Everything ProductSerializer reads, loaded in bulk instead of per row
+        return self.select_related('category').prefetch_related('images').with_comment_counts()
+
+
 class Product(BaseModel):
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
@@ -14,11 +69,43 @@ class Product(BaseModel):
     category = models.ForeignKey(Category, on_delete=models.CASCADE,
                                related_name='products')
     is_active = models.BooleanField(default=True)
+    # Maintained by Comment.save() through ProductQuerySet.add_ratings
     rating = models.FloatField(default=0.0)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
     total_ratings = models.IntegerField(default=0)
+    # Active comments per star, for the 1-5 breakdown on the product page
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+    # Written in batches by products.counters.view_counter
+    view_count = models.PositiveBigIntegerField(default=0)
+
+    objects = ProductQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('rating', 'rating_sum', 'total_ratings', 'view_count',
+                      *(f'rating_{star}' for star in RATING_STARS))
+    # Routes in products/urls.py that come before <slug:slug>/
+    RESERVED_SLUGS = frozenset({'search', 'export', 'autocomplete'})
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Listing/keyset pagination paths, partial on is_active where supported
+            models.Index(fields=['-created_at', '-id'], condition=Q(is_active=True),
+                         name='product_active_created_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], condition=Q(is_active=True),
+                         name='product_active_cat_idx'),
+            models.Index(fields=['price', 'id'], condition=Q(is_active=True),
+                         name='product_active_price_idx'),
+            models.Index(fields=['rating', 'id'], condition=Q(is_active=True),
+                         name='product_active_rating_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=Q(is_active=True, quantity__gt=0),
+                         name='product_in_stock_idx'),
+            models.Index(fields=['-view_count', '-id'], condition=Q(is_active=True),
+                         name='product_active_views_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -28,18 +115,50 @@ class Product(BaseModel):
             self.slug = slugify(self.title)
             original_slug = self.slug
             counter = 1
-            while Product.objects.filter(slug=self.slug).exists():
+            while self.slug in self.RESERVED_SLUGS or Product.objects.filter(slug=self.slug).exists():
                 self.slug = f"{original_slug}-{counter}"
                 counter += 1
-        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            # Never write back counters that may have moved since this instance was loaded
+            update_fields = [field.name for field in self._meta.concrete_fields
+                             if not field.primary_key and field.name not in self.COUNTER_FIELDS]
+            kwargs['update_fields'] = update_fields
+        if update_fields is not None and not {'category', 'category_id', 'is_active'} & set(update_fields):
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            stored = None
+            if not self._state.adding:
+                stored = Product.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'category_id', 'is_active').first()
+            super().save(*args, **kwargs)
+            # Keep Category.product_count / subtree_product_count in step
+            deltas = Counter()
+            if stored and stored[1]:
+                deltas[stored[0]] -= 1
+            if self.is_active:
+                deltas[self.category_id] += 1
+            Category.objects.add_product_counts(deltas)
+
+    @property
+    def rating_distribution(self):
+        return {star: getattr(self, f'rating_{star}') for star in RATING_STARS}
 
     @property
     def in_stock(self):
         return self.quantity > 0
 
+    def get_main_image(self):
+        if 'images' in getattr(self, '_prefetched_objects_cache', {}):
+            return next((image for image in self.images.all() if image.is_main), None)
+        return self.images.filter(is_main=True).first()
+
     @property
     def main_image(self):
-        main = self.images.filter(is_main=True).first()
+        main = self.get_main_image()
         if main:
             return main.image.url
         return None
@@ -49,9 +168,20 @@ class ProductImage(BaseModel):
                                related_name='images')
     image = models.ImageField(upload_to='products/')
     is_main = models.BooleanField(default=False)
+    # Generated thumbnails of `image`, see shared.thumbnails.generate_thumbnails
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ['-is_main', 'created_at']
 
     def __str__(self):
-        return f"Image for {self.product.title}"
\ No newline at end of file
+        return f"Image for {self.product.title}"
+
+    @classmethod
+    def record_thumbnails(cls, name, thumbnails):
+        # save() runs the image signals, which drop the product's cached
+        # payloads; updated_at moves the product's validators
+        for image in cls.objects.filter(image=name):
+            image.thumbnails = thumbnails
+            image.save(update_fields=['thumbnails', 'updated_at'])
+            Product.objects.filter(pk=image.product_id).update(updated_at=Now())
\ No newline at end of file
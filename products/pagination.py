@@ -0,0 +1,10 @@
+from core.pagination import KeysetPagination
+
+
+class ProductSearchPagination(KeysetPagination):
+
+    def get_ordering(self, request, queryset, view):
+        # Ranked searches page through relevance, plain filtering through recency
+        if 'search_rank' in queryset.query.annotations:
+            return ('search_rank',)
+        return super().get_ordering(request, queryset, view)
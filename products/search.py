@@ -0,0 +1,233 @@
+import re
+import uuid
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+
+FTS_TABLE = 'products_product_fts'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# SQLite: FTS5 virtual table, PostgreSQL: tsvector side table with a GIN index
+SQLITE_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "product_id UNINDEXED, title, description, category, "
+    "tokenize='unicode61 remove_diacritics 2')",
+)
+POSTGRES_SCHEMA = (
+    f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+    "product_id uuid PRIMARY KEY REFERENCES products_product (id) "
+    "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_gin "
+    f"ON {FTS_TABLE} USING GIN (document)",
+)
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', %s), 'A') || "
+    "setweight(to_tsvector('simple', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'C')"
+)
+
+
+def max_results():
+    return getattr(settings, 'PRODUCT_SEARCH_MAX_RESULTS', 1000)
+
+
+def get_engine():
+    return getattr(settings, 'PRODUCT_SEARCH_ENGINE', 'database')
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor in ('sqlite', 'postgresql')
+
+
+def engine_available():
+    return get_engine() == 'memory' or is_supported()
+
+
+def search_products(query, limit=None, queryset=None):
+    """Run ``query`` through the engine selected by ``PRODUCT_SEARCH_ENGINE``.
+
+    With ``queryset`` only products in it are returned, and ``limit``
+    applies after that restriction.
+    """
+    limit = limit or max_results()
+    if get_engine() == 'memory':
+        from .search_index import index
+        if queryset is None:
+            return index.search(query, limit)
+        return filter_hits(index.search(query), queryset, limit)
+    return search(query, limit, queryset)
+
+
+def filter_hits(hits, queryset, limit):
+    """The best ``limit`` of ranked ``hits`` that are in ``queryset``.
+
+    Hits are checked ``limit`` at a time, so a selective filter costs more
+    queries but never an unbounded IN list.
+    """
+    kept = []
+    for start in range(0, len(hits), limit):
+        batch = hits[start:start + limit]
+        allowed = set(queryset.filter(id__in=[pk for pk, _ in batch]).values_list('id', flat=True))
+        kept.extend(hit for hit in batch if hit[0] in allowed)
+        if len(kept) >= limit:
+            break
+    return kept[:limit]
+
+
+def create_schema(conn=None):
+    conn = conn or connection
+    statements = SQLITE_SCHEMA if conn.vendor == 'sqlite' else POSTGRES_SCHEMA
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_schema(conn=None):
+    with (conn or connection).cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def _rowid(product_id):
+    # FTS5 rowids are signed 64-bit integers, keep the top 63 bits of the UUID
+    return product_id.int >> 65
+
+
+def _document(product):
+    return (product.title, product.description, product.category.title)
+
+
+def index_products(products, conn=None):
+    """Add or refresh the index rows of ``products``; inactive ones are dropped."""
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+    products = list(products)
+    active = [p for p in products if p.is_active]
+    inactive = [p.id for p in products if not p.is_active]
+    if inactive:
+        remove_products(inactive, conn)
+    if not active:
+        return
+
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {FTS_TABLE} "
+                "(rowid, product_id, title, description, category) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [(_rowid(p.id), p.id.hex, *_document(p)) for p in active],
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (product_id, document) "
+                f"VALUES (%s, {POSTGRES_DOCUMENT}) "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                [(p.id, *_document(p)) for p in active],
+            )
+
+
+def remove_products(product_ids, conn=None):
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(_rowid(pk),) for pk in product_ids],
+            )
+        else:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE product_id = %s",
+                [(pk,) for pk in product_ids],
+            )
+
+
+def rebuild(queryset=None, batch_size=1000, conn=None):
+    from .models import Product
+
+    conn = conn or connection
+    if queryset is None:
+        queryset = Product.objects.filter(is_active=True)
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    batch = []
+    for product in queryset.select_related('category').iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            index_products(batch, conn)
+            batch = []
+    index_products(batch, conn)
+
+
+def _within(queryset):
+    """SQL condition and params restricting index rows to ``queryset``."""
+    if queryset is None:
+        return '', []
+    sql, params = queryset.order_by().values('id').query.sql_with_params()
+    return f" AND product_id IN ({sql})", list(params)
+
+
+def search(query, limit=None, queryset=None):
+    """Return ``[(product_id, score), ...]`` best match first.
+
+    The last token is matched as a prefix so partially typed words still hit.
+    ``queryset`` is applied in the same statement, before the limit.
+    """
+    tokens = tokenize(query)
+    if not tokens or (queryset is not None and queryset.query.is_empty()):
+        return []
+    limit = limit or max_results()
+    within, within_params = _within(queryset)
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            match = ' '.join(f'"{t}"' for t in tokens[:-1])
+            match = f'{match} "{tokens[-1]}"*'.strip()
+            cursor.execute(
+                f"SELECT product_id, bm25({FTS_TABLE}, 0.0, 10.0, 1.0, 5.0) AS score "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s{within} "
+                "ORDER BY score LIMIT %s",
+                [match, *within_params, limit],
+            )
+            # bm25() is negative, lower is better
+            return [(uuid.UUID(pk), -score) for pk, score in cursor.fetchall()]
+
+        tsquery = ' & '.join(tokens[:-1] + [f'{tokens[-1]}:*'])
+        cursor.execute(
+            "SELECT product_id, ts_rank_cd(document, query) AS score "
+            f"FROM {FTS_TABLE}, to_tsquery('simple', %s) query "
+            f"WHERE document @@ query{within} ORDER BY score DESC LIMIT %s",
+            [tsquery, *within_params, limit],
+        )
+        return [(pk, score) for pk, score in cursor.fetchall()]
+
+
+def restrict_to_hits(queryset, hits):
+    if not hits:
+        return queryset.none()
+    return queryset.filter(id__in=[pk for pk, _ in hits])
+
+
+def apply_ranking(queryset, hits):
+    """Restrict ``queryset`` to ``hits`` and order it by relevance."""
+    if not hits:
+        return queryset.none()
+    ids = [pk for pk, _ in hits]
+    return restrict_to_hits(queryset, hits).annotate(
+        search_rank=Case(
+            *[When(id=pk, then=Value(position)) for position, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+    ).order_by('search_rank')
@@ -0,0 +1,306 @@
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .search import tokenize
+
+# Field weights used for BM25F-style term frequencies
+FIELD_WEIGHTS = {'title': 3.0, 'category': 2.0, 'description': 1.0}
+K1 = 1.2
+B = 0.75
+MAX_PREFIX_EXPANSIONS = 20
+
+
+def trigrams(term):
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(term):
+    if len(term) < 4:
+        return 0
+    if len(term) < 8:
+        return 1
+    return 2
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, or ``limit + 1`` once it is exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SyncedIndex:
+    """Base for in-process indexes kept in step with the database.
+
+    The first use builds the index from scratch. Saves in this process are
+    applied through signals; saves in other worker processes are picked up
+    by a catch-up over rows whose ``updated_at`` moved since the last sync,
+    at most every ``get_sync_interval()`` seconds.
+
+    Subclasses implement ``_reset()``, ``_load()`` and ``_catch_up(since)``;
+    all three run under the index lock.
+    """
+
+    def __init__(self, sync_interval=None):
+        self.sync_interval = sync_interval
+        self._lock = threading.RLock()
+        self._built = False
+        self._synced_at = None
+        self._last_sync_check = 0.0
+        self._reset()
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _catch_up(self, since):
+        raise NotImplementedError
+
+    def get_sync_interval(self):
+        if self.sync_interval is not None:
+            return self.sync_interval
+        return getattr(settings, 'PRODUCT_SEARCH_INDEX_SYNC_INTERVAL', 30)
+
+    @property
+    def built(self):
+        return self._built
+
+    def build(self):
+        started = timezone.now()
+        with self._lock:
+            self._reset()
+            self._load()
+            self._built = True
+            self._synced_at = started
+            self._last_sync_check = time.monotonic()
+
+    def ensure_ready(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+            return
+        if time.monotonic() - self._last_sync_check >= self.get_sync_interval():
+            self.catch_up()
+
+    def catch_up(self):
+        """Apply rows changed since the last sync, including other processes' writes."""
+        with self._lock:
+            started = timezone.now()
+            self._last_sync_check = time.monotonic()
+            self._catch_up(self._synced_at)
+            self._synced_at = started
+
+
+class ProductSearchIndex(SyncedIndex):
+    """In-process inverted index over active products.
+
+    Ranks with BM25 and tolerates typos through a trigram index over the
+    vocabulary. Kept current like every ``SyncedIndex``.
+    """
+
+    def _reset(self):
+        self._fields = {}  # product_id -> {field: [tokens]}
+        self._category_of = {}
+        self._category_members = defaultdict(set)
+        self._lengths = {}
+        self._total_length = 0.0
+        self._postings = defaultdict(dict)  # term -> {product_id: weighted tf}
+        self._terms = []  # sorted vocabulary for prefix lookups
+        self._trigrams = defaultdict(set)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def _load(self):
+        from .models import Product
+
+        queryset = Product.objects.filter(is_active=True).select_related('category')
+        for product in queryset.iterator(chunk_size=2000):
+            self._add(product)
+
+    def _catch_up(self, since):
+        from categories.models import Category
+        from .models import Product
+
+        self._update(Product.objects.filter(updated_at__gte=since).select_related('category'))
+        for category in Category.objects.filter(updated_at__gte=since):
+            self._rename_category(category)
+
+    def update(self, products):
+        if not self._built:
+            return
+        with self._lock:
+            self._update(products)
+
+    def remove(self, product_ids):
+        if not self._built:
+            return
+        with self._lock:
+            for product_id in product_ids:
+                self._remove(product_id)
+
+    def rename_category(self, category):
+        if not self._built:
+            return
+        with self._lock:
+            self._rename_category(category)
+
+    def _update(self, products):
+        for product in products:
+            self._remove(product.id)
+            if product.is_active:
+                self._add(product)
+
+    def _add(self, product):
+        fields = {
+            'title': tokenize(product.title),
+            'description': tokenize(product.description),
+            'category': tokenize(product.category.title),
+        }
+        self._fields[product.id] = fields
+        self._category_of[product.id] = product.category_id
+        self._category_members[product.category_id].add(product.id)
+        self._index_document(product.id, fields)
+
+    def _remove(self, product_id):
+        fields = self._fields.pop(product_id, None)
+        if fields is None:
+            return
+        category_id = self._category_of.pop(product_id)
+        self._category_members[category_id].discard(product_id)
+        if not self._category_members[category_id]:
+            del self._category_members[category_id]
+        self._unindex_document(product_id, fields)
+
+    def _rename_category(self, category):
+        tokens = tokenize(category.title)
+        for product_id in list(self._category_members.get(category.id, ())):
+            fields = self._fields[product_id]
+            if fields['category'] == tokens:
+                continue
+            self._unindex_document(product_id, fields)
+            fields['category'] = tokens
+            self._index_document(product_id, fields)
+
+    def _index_document(self, product_id, fields):
+        frequencies = defaultdict(float)
+        for field, tokens in fields.items():
+            for token in tokens:
+                frequencies[token] += FIELD_WEIGHTS[field]
+        length = sum(frequencies.values())
+        self._lengths[product_id] = length
+        self._total_length += length
+        for term, frequency in frequencies.items():
+            postings = self._postings[term]
+            if not postings:
+                insort(self._terms, term)
+                for gram in trigrams(term):
+                    self._trigrams[gram].add(term)
+            postings[product_id] = frequency
+
+    def _unindex_document(self, product_id, fields):
+        self._total_length -= self._lengths.pop(product_id, 0.0)
+        terms = {token for tokens in fields.values() for token in tokens}
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+                for gram in trigrams(term):
+                    self._trigrams[gram].discard(term)
+                    if not self._trigrams[gram]:
+                        del self._trigrams[gram]
+
+    def _prefix_terms(self, prefix):
+        start = bisect_left(self._terms, prefix)
+        matches = []
+        for term in self._terms[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                matches.append(term)
+        return matches
+
+    def _fuzzy_terms(self, token):
+        edits = max_edits(token)
+        if not edits:
+            return []
+        grams = trigrams(token)
+        shared = defaultdict(int)
+        for gram in grams:
+            for term in self._trigrams.get(gram, ()):
+                shared[term] += 1
+        # Each edit touches at most 3 trigrams, a transposition at most 4
+        required = max(1, len(grams) - 4 * edits)
+        matches = []
+        for term, count in shared.items():
+            if count < required:
+                continue
+            distance = edit_distance(token, term, edits)
+            if distance <= edits:
+                matches.append((term, distance))
+        return matches
+
+    def _expand(self, token, is_last):
+        expansions = {}
+        if token in self._postings:
+            expansions[token] = 1.0
+        else:
+            for term, distance in self._fuzzy_terms(token):
+                expansions[term] = 1.0 / (1 + distance)
+        if is_last:
+            for term in self._prefix_terms(token):
+                expansions.setdefault(term, 0.8)
+        return expansions
+
+    def search(self, query, limit=None):
+        """Return ``[(product_id, score), ...]`` best match first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self.ensure_ready()
+        with self._lock:
+            count = len(self._fields)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            scores = defaultdict(float)
+            for token in dict.fromkeys(tokens):
+                is_last = token == tokens[-1]
+                for term, weight in self._expand(token, is_last).items():
+                    postings = self._postings[term]
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for product_id, frequency in postings.items():
+                        norm = K1 * (1 - B + B * self._lengths[product_id] / average_length)
+                        scores[product_id] += weight * idf * frequency * (K1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit else ranked
+
+
+index = ProductSearchIndex()
@@ -1,16 +1,37 @@
+import math
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
 from categories.models import Category
+from core.serializers import ValuesSerializer
+from shared.thumbnails import thumbnail_urls
 from .models import Product, ProductImage
-from categories.serializers import CategorySerializer
+from categories.serializers import CategorySummarySerializer, CategorySummaryValuesSerializer
+
+
+def main_image_url(name):
+    # The storage URL, not an absolute one, same as Product.main_image
+    return default_storage.url(name) if name else None
+
+
+def main_image_thumbnails(name, thumbnails):
+    return thumbnail_urls(name, thumbnails) if name else None
+
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    thumbnails = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'is_main']
+        fields = ['id', 'image', 'thumbnails', 'is_main']
+
+    def get_thumbnails(self, obj):
+        return thumbnail_urls(obj.image.name, obj.thumbnails, self.context.get('request'))
 
 class ProductSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
+    category = CategorySummarySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.filter(is_active=True),
         source='category',
@@ -19,6 +40,7 @@ class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     in_stock = serializers.BooleanField(read_only=True)
     main_image = serializers.SerializerMethodField()
+    main_image_thumbnails = serializers.SerializerMethodField()
     total_comments = serializers.SerializerMethodField()
 
     class Meta:
@@ -26,24 +48,132 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'slug', 'description', 'price',
                  'quantity', 'category', 'category_id', 'is_active',
                  'rating', 'in_stock', 'images', 'main_image',
-                 'total_comments', 'created_at', 'updated_at']
+                 'main_image_thumbnails', 'total_comments', 'created_at', 'updated_at']
         read_only_fields = ['slug', 'rating', 'total_ratings']
 
     def get_main_image(self, obj):
-        return obj.main_image
+        main = obj.get_main_image()
+        return main_image_url(main.image.name if main else None)
+
+    def get_main_image_thumbnails(self, obj):
+        main = obj.get_main_image()
+        return main_image_thumbnails(main.image.name, main.thumbnails) if main else None
 
     def get_total_comments(self, obj):
+        count = getattr(obj, 'active_comments_count', None)
+        if count is not None:
+            return count
         return obj.comments.filter(is_active=True).count()
 
+class ProductDetailSerializer(ProductSerializer):
+    # Star breakdown read from the per-star counters, {"1": n, ..., "5": n}
+    rating_distribution = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['total_ratings', 'rating_distribution']
+
+
+class ProductImageValuesSerializer(ValuesSerializer):
+    serializer_class = ProductImageSerializer
+    columns = ['id', 'product_id', 'image', 'is_main', 'thumbnails']
+    computed = ('image', 'thumbnails')
+
+    def get_image(self, row):
+        return self.file_url(self.value(row, 'image'))
+
+    def get_thumbnails(self, row):
+        return thumbnail_urls(self.value(row, 'image'), self.value(row, 'thumbnails'), self.request)
+
+
+class ProductValuesSerializer(ValuesSerializer):
+    serializer_class = ProductSerializer
+    columns = ['id', 'title', 'slug', 'description', 'price', 'quantity',
+               'is_active', 'rating', 'active_comments_count', 'created_at', 'updated_at',
+               *CategorySummaryValuesSerializer.prefixed_columns('category__')]
+    computed = ('category', 'in_stock', 'images', 'main_image', 'main_image_thumbnails',
+                'total_comments')
+
+    def __init__(self, context=None, prefix=''):
+        super().__init__(context, prefix)
+        self.category_serializer = CategorySummaryValuesSerializer(self.context, prefix=f'{prefix}category__')
+        self.image_serializer = ProductImageValuesSerializer(self.context)
+
+    def annotate(self, queryset):
+        return queryset.with_comment_counts()
+
+    def prefetch(self, rows):
+        self.images = defaultdict(list)
+        image_rows = self.image_serializer.get_queryset(ProductImage.objects.filter(
+            product_id__in=[self.value(row, 'id') for row in rows]
+        ).order_by(*ProductImage._meta.ordering))
+        for image in image_rows:
+            self.images[image['product_id']].append(image)
+
+    def serialize_ids(self, product_ids):
+        """``{product_id: data}`` for nesting products inside other payloads."""
+        queryset = self.get_queryset(Product.objects.filter(id__in=set(product_ids)))
+        rows = list(queryset)
+        return dict(zip((row['id'] for row in rows), self.serialize(rows)))
+
+    def get_category(self, row):
+        return self.category_serializer.to_representation(row)
+
+    def get_in_stock(self, row):
+        return self.value(row, 'quantity') > 0
+
+    def get_images(self, row):
+        return [self.image_serializer.to_representation(image)
+                for image in self.images[self.value(row, 'id')]]
+
+    def get_total_comments(self, row):
+        return self.value(row, 'active_comments_count')
+
+    def main_image(self, row):
+        for image in self.images[self.value(row, 'id')]:
+            if image['is_main']:
+                return image
+        return None
+
+    def get_main_image(self, row):
+        main = self.main_image(row)
+        return main_image_url(main['image'] if main else None)
+
+    def get_main_image_thumbnails(self, row):
+        main = self.main_image(row)
+        return main_image_thumbnails(main['image'], main['thumbnails']) if main else None
+
+
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ['title', 'description', 'price', 'quantity',
                  'category', 'is_active']
 
+class MinRatingField(serializers.FloatField):
+    """An average rating threshold, 1 to 5 stars."""
+    default_error_messages = {'invalid': "Reyting son bo'lishi kerak"}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('min_value', 1)
+        kwargs.setdefault('max_value', 5)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        # float() accepts 'nan', which passes both range validators
+        if not math.isfinite(value):
+            self.fail('invalid')
+        return value
+
+
 class ProductSearchSerializer(serializers.Serializer):
     q = serializers.CharField(required=False)
     category = serializers.CharField(required=False)
+    # Slug or id of a category, matches its descendants too
+    category_tree = serializers.CharField(required=False)
     min_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
     max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
-    in_stock = serializers.BooleanField(required=False)
\ No newline at end of file
+    # "4 stars and up"
+    min_rating = MinRatingField(required=False)
+    # Without a default BooleanField reads a missing query param as False
+    in_stock = serializers.BooleanField(required=False, allow_null=True, default=None)
\ No newline at end of file
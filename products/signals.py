@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from categories.models import Category
+from shared.thumbnails import schedule_thumbnails
+from . import search
+from .autocomplete import CATEGORY, PRODUCT, autocomplete_index
+from .cache import product_detail_cache, product_list_version
+from .models import Product, ProductImage
+from .search_index import index
+
+# Category fields copied into the product search index (title) and the
+# product payloads (all of them)
+EMBEDDED_CATEGORY_FIELDS = ('title', 'slug', 'parent_id')
+EMBEDDED_CATEGORY_UPDATE_FIELDS = {'title', 'slug', 'parent', 'parent_id'}
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_products([instance])
+    transaction.on_commit(lambda: index.update([instance]))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.remove_products([instance.id])
+    transaction.on_commit(lambda: index.remove([instance.id]))
+
+
+@receiver(post_delete, sender=Product)
+def uncount_product(sender, instance, **kwargs):
+    if instance.is_active:
+        Category.objects.add_product_counts({instance.category_id: -1})
+
+
+def _touches_embedded_fields(update_fields):
+    return update_fields is None or bool(EMBEDDED_CATEGORY_UPDATE_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=Category)
+def remember_embedded_category_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or not _touches_embedded_fields(update_fields):
+        return
+    instance._stored_embedded = Category.objects.filter(pk=instance.pk).values_list(
+        *EMBEDDED_CATEGORY_FIELDS).first()
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_products(sender, instance, created=False, raw=False, **kwargs):
+    stored = instance.__dict__.pop('_stored_embedded', None)
+    if raw or created or stored is None:
+        return
+    # Activation or description edits leave the products alone
+    changed = {field for field, value in zip(EMBEDDED_CATEGORY_FIELDS, stored)
+               if getattr(instance, field) != value}
+    if not changed:
+        return
+    if 'title' in changed:
+        products = Product.objects.filter(category=instance, is_active=True).select_related('category')
+        search.index_products(products)
+        transaction.on_commit(lambda: index.rename_category(instance))
+    slugs = Product.objects.filter(category=instance).values_list('slug', flat=True)
+    product_detail_cache.invalidate_on_commit(*slugs)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_detail(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    product_detail_cache.invalidate_on_commit(instance.slug)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_image_detail(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    slug = Product.objects.filter(pk=instance.product_id).values_list('slug', flat=True).first()
+    if slug:
+        product_detail_cache.invalidate_on_commit(slug)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_product_lists(sender, instance, raw=False, **kwargs):
+    # category_tree filters follow activation and moves of any category
+    if not raw:
+        product_list_version.invalidate_on_commit()
+
+
+@receiver(post_save, sender=ProductImage)
+def generate_product_image_thumbnails(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'image' not in update_fields):
+        return
+    schedule_thumbnails(instance.image.name, ProductImage.record_thumbnails)
+
+
+@receiver(post_save, sender=Product)
+def update_product_suggestions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(lambda: autocomplete_index.update_products([instance]))
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_suggestions(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete_index.remove(PRODUCT, [instance.id]))
+
+
+@receiver(post_save, sender=Category)
+def update_category_suggestions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(lambda: autocomplete_index.update_categories([instance]))
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestions(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete_index.remove(CATEGORY, [instance.id]))
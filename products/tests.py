@@ -1,3 +1,710 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.db import DatabaseError, connection
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from categories.cache import category_tree_cache
+from categories.models import Category
+from core.utils import allocate_unique_slugs
+from comments.models import Comment
+from users.models import User
+from . import export
+from .autocomplete import AutocompleteIndex
+from .cache import product_detail_cache
+from .counters import ViewCounterBuffer
+from .importer import ProductImporter
+from .search_index import ProductSearchIndex
+from .serializers import ProductSearchSerializer
+from .models import Product, ProductImage
+
+
+class ProductListQueryCountTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='Phones')
+        cls.users = [User.objects.create(username=f'reviewer{i}', password='x') for i in range(2)]
+
+    def create_products(self, count):
+        for i in range(count):
+            product = Product.objects.create(
+                title=f'Phone {i}', description='Smartphone', price=100 + i,
+                quantity=i, category=self.category,
+            )
+            ProductImage.objects.create(product=product, image=f'products/{i}.jpg', is_main=True)
+            ProductImage.objects.create(product=product, image=f'products/{i}-b.jpg')
+            for user in self.users:
+                Comment.objects.create(user=user, product=product, text='Good', rating=4)
+
+    def capture_list(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries.captured_queries]
+
+    def related_queries(self, queries):
+        return [sql for sql in queries
+                if 'products_productimage' in sql or 'comments_comment' in sql]
+
+    def test_query_count_is_constant_in_page_size(self):
+        self.create_products(2)
+        _, small_page = self.capture_list()
+
+        self.create_products(10)
+        response, large_page = self.capture_list()
+
+        self.assertEqual(len(response.data['results']), 12)
+        self.assertEqual(len(self.related_queries(small_page)),
+                         len(self.related_queries(large_page)))
+        self.assertEqual(len(small_page), len(large_page))
+
+    def test_prefetched_fields_are_serialized(self):
+        self.create_products(1)
+        response, _ = self.capture_list()
+
+        product = response.data['results'][0]
+        self.assertEqual(product['total_comments'], 2)
+        self.assertEqual(len(product['images']), 2)
+        self.assertEqual(product['main_image'], '/media/products/0.jpg')
+        self.assertEqual(product['category'], {
+            'id': str(self.category.id),
+            'title': 'Phones',
+            'slug': 'phones',
+            'parent_id': None,
+        })
+
+
+class ProductListValuesSerializationTest(ProductListQueryCountTest):
+
+    def test_values_rows_render_identical_json(self):
+        self.create_products(3)
+        product = Product.objects.first()
+        ProductImage.objects.create(product=product, image='products/x.jpg')
+        ProductImage.objects.create(product=product, image='products/main.jpg', is_main=True)
+        child = Category.objects.create(title='Child', parent=self.category)
+        Product.objects.create(title='Empty', description='', price='9.99', category=child)
+        url = reverse('product-list') + '?ordering=price&page_size=3'
+
+        fast = self.client.get(url)
+        with override_settings(VALUES_LIST_SERIALIZATION=False):
+            slow = self.client.get(url)
+
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+        self.assertIsNotNone(fast.data['next'])
+        self.assertEqual(self.client.get(fast.data['next']).content,
+                         self.client.get(slow.data['next']).content)
+
+
+class ProductListConditionalGetTest(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(title='Phones')
+        self.product = Product.objects.create(title='Phone', description='x', price=1,
+                                              category=self.category)
+        self.user = User.objects.create(username='reviewer', password='x')
+        # Committed category saves would rebuild the tree on a background thread
+        patcher = mock.patch.object(category_tree_cache, 'schedule_warm')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def etag(self, **params):
+        response = self.client.get(reverse('product-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assertChangesETag(self, func):
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_unchanged_list_is_revalidated_without_queries(self):
+        etag = self.etag()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries.captured_queries, [])
+
+    def test_removed_products_change_the_etag(self):
+        response = self.client.get(reverse('product-list'))
+        # max(updated_at) would not move when a product leaves the list
+        self.assertNotIn('Last-Modified', response)
+        self.product.is_active = False
+        self.assertChangesETag(self.product.save)
+
+    @mock.patch('products.signals.schedule_thumbnails')
+    def test_image_edits_change_the_etag(self, schedule_thumbnails):
+        self.assertChangesETag(lambda: ProductImage.objects.create(
+            product=self.product, image='products/a.jpg', is_main=True))
+        image = ProductImage.objects.get()
+        image.image = 'products/b.jpg'
+        self.assertChangesETag(image.save)
+        self.assertChangesETag(image.delete)
+
+    def test_category_edits_change_the_etag(self):
+        self.category.title = 'Smartphones'
+        self.assertChangesETag(self.category.save)
+
+    def test_comment_edits_change_the_etag(self):
+        self.assertChangesETag(lambda: Comment.objects.create(
+            user=self.user, product=self.product, text='Good', rating=4))
+        comment = Comment.objects.get()
+        comment.is_active = False
+        self.assertChangesETag(comment.save)
+
+    def test_view_flushes_only_change_lists_ordered_by_views(self):
+        by_views, by_price = self.etag(ordering='-view_count'), self.etag(ordering='price')
+        counter = ViewCounterBuffer(flush_interval=3600, max_pending=10 ** 6)
+        counter.increment(self.product.pk)
+        counter.flush()
+        self.assertNotEqual(self.etag(ordering='-view_count'), by_views)
+        self.assertEqual(self.etag(ordering='price'), by_price)
+
+
+class ProductFacetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.phones = Category.objects.create(title='Phones')
+        cls.android = Category.objects.create(title='Android', parent=cls.phones)
+        laptops = Category.objects.create(title='Laptops')
+        for title, price, quantity, category in (
+            ('Nokia 105', 30, 1, cls.phones),
+            ('iPhone SE', 80, 0, cls.phones),
+            ('iPhone 15 Pro', 700, 5, cls.phones),
+            ('Pixel 8', 120, 3, cls.android),
+            ('ThinkPad X1', 900, 2, laptops),
+            ('MacBook Pro', 1500, 1, laptops),
+        ):
+            Product.objects.create(title=title, description='x', price=price,
+                                   quantity=quantity, category=category)
+
+    def facets(self, name, params):
+        response = self.client.get(reverse(name), {'facets': 'all', **params})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        facets = data['facets']
+        return (sorted(product['slug'] for product in data['results']),
+                [(row['title'], row['count']) for row in facets['category']],
+                [bucket['count'] for bucket in facets['price']],
+                facets['in_stock'])
+
+    def test_list_facets_follow_every_filter(self):
+        params = {'category_tree': 'phones', 'in_stock': 'true', 'min_price': 50}
+        self.assertEqual(self.facets('product-list', params), (
+            ['iphone-15-pro', 'pixel-8'],
+            [('Android', 1), ('Phones', 1)],
+            [0, 0, 1, 1, 0],
+            {'true': 2, 'false': 0},
+        ))
+        # Filter backends narrow the facets too
+        params.update(search='pixel', category=self.android.pk)
+        self.assertEqual(self.facets('product-list', params), (
+            ['pixel-8'], [('Android', 1)], [0, 0, 1, 0, 0], {'true': 1, 'false': 0},
+        ))
+
+    def test_search_facets_follow_every_filter(self):
+        params = {'category_tree': 'phones', 'max_price': 500, 'in_stock': 'false'}
+        self.assertEqual(self.facets('product-search', params), (
+            ['iphone-se'], [('Phones', 1)], [0, 1, 0, 0, 0], {'true': 0, 'false': 1},
+        ))
+        params = {'q': 'iphone', 'min_price': 100, 'category': 'phones'}
+        self.assertEqual(self.facets('product-search', params), (
+            ['iphone-15-pro'], [('Phones', 1)], [0, 0, 0, 1, 0], {'true': 1, 'false': 0},
+        ))
+
+    def test_search_params_are_validated_once(self):
+        with mock.patch('products.views.ProductSearchSerializer',
+                        wraps=ProductSearchSerializer) as serializer:
+            self.facets('product-search', {'min_price': 50, 'in_stock': 'true'})
+        self.assertEqual(serializer.call_count, 1)
+
+
+class ProductExportTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', password='x', is_staff=True)
+        category = Category.objects.create(title='Phones')
+        cls.products = [Product.objects.create(title=f'Phone {i}', description='x', price=10 + i,
+                                               quantity=i, category=category) for i in range(3)]
+        Product.objects.create(title='Hidden', description='x', price=1, category=category, is_active=False)
+        with mock.patch('products.signals.schedule_thumbnails'):
+            ProductImage.objects.create(product=cls.products[0], image='products/side.jpg')
+            ProductImage.objects.create(product=cls.products[0], image='products/main.jpg', is_main=True)
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('product-export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_lists_active_products_in_creation_order(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([row['slug'] for row in rows], ['phone-0', 'phone-1', 'phone-2'])
+        self.assertEqual(list(rows[0]), export.EXPORT_FIELDS)
+        self.assertEqual(rows[0]['main_image'], '/media/products/main.jpg')
+        self.assertEqual(rows[0]['category_slug'], 'phones')
+        self.assertIsNone(rows[1]['main_image'])
+
+    def test_csv_has_a_header_and_one_line_per_product(self):
+        lines = self.export(export_format='csv').splitlines()
+        self.assertEqual(lines[0], ','.join(export.EXPORT_FIELDS))
+        self.assertEqual(len(lines), 4)
+        self.assertIn('phone-2', lines[3])
+
+    def test_rows_are_read_lazily_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('product-export'))
+        self.assertEqual(queries.captured_queries, [])
+        response.close()
+        with mock.patch.object(export, 'export_queryset', wraps=export.export_queryset) as queryset:
+            rows = list(export.iter_rows(chunk_size=1))
+        self.assertEqual(len(rows), 3)
+        queryset.assert_called_once_with()
+
+    def test_rejects_unknown_formats_and_non_staff(self):
+        response = self.client.get(reverse('product-export'), {'export_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(User.objects.create(username='client', password='x'))
+        self.assertEqual(self.client.get(reverse('product-export')).status_code, 403)
+
+    @mock.patch('products.views.view_counter')
+    def test_reserved_slugs_keep_their_routes(self, view_counter):
+        product = Product.objects.create(title='Export', description='x', price=1,
+                                         category=self.products[0].category)
+        self.assertEqual(product.slug, 'export-1')
+        self.assertEqual(self.client.get(reverse('product-detail', args=[product.slug])).status_code, 200)
+        self.assertTrue(self.client.get(reverse('product-export')).streaming)
+
+
+class ViewCounterBufferTest(TestCase):
+
+    def test_concurrent_increments_are_flushed_in_one_batch(self):
+        category = Category.objects.create(title='Phones')
+        products = [Product.objects.create(title=f'Phone {i}', description='x', price=1,
+                                           category=category) for i in range(3)]
+        buffer = ViewCounterBuffer(flush_interval=3600, max_pending=10 ** 6)
+
+        def hit():
+            for i in range(300):
+                buffer.increment(products[i % 3].id)
+
+        threads = [threading.Thread(target=hit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 2400)
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(sorted(Product.objects.values_list('view_count', flat=True)), [800] * 3)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_failed_flush_is_logged_and_rebuffered(self):
+        category = Category.objects.create(title='Phones')
+        product = Product.objects.create(title='Phone', description='x', price=1, category=category)
+        buffer = ViewCounterBuffer(flush_interval=3600, max_pending=10 ** 6)
+        buffer.increment(product.id, 5)
+
+        with mock.patch('django.db.models.QuerySet.update', side_effect=DatabaseError('down')):
+            with self.assertLogs('products.counters', 'WARNING') as logs:
+                with self.assertRaises(DatabaseError):
+                    buffer.flush()
+        self.assertIn('Re-buffered 5 views of 1 products', logs.output[0])
+        self.assertEqual(buffer.pending, 5)
+
+        self.assertEqual(buffer.flush(), 5)
+        product.refresh_from_db()
+        self.assertEqual(product.view_count, 5)
+
+
+@mock.patch('products.views.view_counter')
+class ProductDetailCacheInvalidationTest(TestCase):
+
+    def setUp(self):
+        product_detail_cache.cache.clear()
+        # Category edits would rebuild the tree on a background thread
+        patcher = mock.patch.object(category_tree_cache, 'schedule_warm')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.category = Category.objects.create(title='Phones')
+        self.product = Product.objects.create(title='Phone', description='x', price=1,
+                                              category=self.category)
+        self.user = User.objects.create(username='reviewer', password='x')
+        self.url = reverse('product-detail', kwargs={'slug': self.product.slug})
+
+    def get(self):
+        # Warms the entry, then checks the next read is served from it
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(product_detail_cache.get(self.product.slug, response.wsgi_request))
+        return response.data
+
+    def change(self, func):
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+        return self.get()
+
+    def test_product_edit(self, view_counter):
+        self.get()
+        self.product.title = 'Renamed phone'
+        self.assertEqual(self.change(self.product.save)['title'], 'Renamed phone')
+
+    @mock.patch('products.signals.schedule_thumbnails')
+    def test_image_edit(self, schedule_thumbnails, view_counter):
+        self.get()
+        data = self.change(lambda: ProductImage.objects.create(
+            product=self.product, image='products/a.jpg', is_main=True))
+        self.assertEqual(data['main_image'], '/media/products/a.jpg')
+        image = ProductImage.objects.get()
+        self.assertEqual(self.change(image.delete)['images'], [])
+
+    def test_comment_edit(self, view_counter):
+        self.get()
+        data = self.change(lambda: Comment.objects.create(user=self.user, product=self.product,
+                                                          text='Good', rating=4))
+        self.assertEqual((data['total_comments'], data['rating']), (1, 4.0))
+
+    def test_category_edit(self, view_counter):
+        self.get()
+        self.category.title = 'Smartphones'
+        self.assertEqual(self.change(self.category.save)['category']['title'], 'Smartphones')
+        parent = Category.objects.create(title='Devices')
+        self.category.parent = parent
+        self.assertEqual(self.change(self.category.save)['category']['parent_id'], str(parent.pk))
+
+    def test_category_edits_outside_the_payload_leave_products_alone(self, view_counter):
+        other = Category.objects.create(title='Hidden')
+        with mock.patch('products.signals.search.index_products') as index_products, \
+                mock.patch.object(product_detail_cache, 'invalidate') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.category.is_active = False
+                self.category.save()
+                other.title = 'Renamed'
+                other.save(update_fields=['is_active'])
+            index_products.assert_not_called()
+            invalidate.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.category.title = 'Smartphones'
+                self.category.save(update_fields=['title'])
+            index_products.assert_called_once()
+            invalidate.assert_called_once_with(self.product.slug)
+
+    def test_missing_product_is_not_served_from_cache(self, view_counter):
+        self.get()
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_deploy_check_warns_about_process_local_backend(self, view_counter):
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}
+        for backend, warns in ((locmem, True), (redis, False)):
+            with override_settings(CACHES={'default': locmem, 'products': backend}):
+                err = StringIO()
+                try:
+                    call_command('check', deploy=True, fail_level='WARNING', stderr=err,
+                                 stdout=StringIO())
+                except SystemCheckError as exc:
+                    err.write(str(exc))
+                self.assertEqual('products.W001' in err.getvalue(), warns)
+
+
+class AutocompleteIndexTest(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(title='Phones')
+        for title, rating in (('Apple iPhone 15', 5.0), ('iPhone case', 3.0), ('iPhone 14', 4.0),
+                              ('Samsung Galaxy', 5.0)):
+            Product.objects.create(title=title, description='x', price=1, category=self.category,
+                                   rating=rating)
+        self.index = AutocompleteIndex(sync_interval=3600)
+        self.index.build()
+
+    def titles(self, query, kind='products'):
+        return [row['title'] for row in self.index.suggest(query)[kind]]
+
+    def test_prefix_ranking(self):
+        # Title starts first, then by rating; inner words still match
+        self.assertEqual(self.titles('iph'), ['iPhone 14', 'iPhone case', 'Apple iPhone 15'])
+        self.assertEqual(self.titles('IPHONE 1'), ['iPhone 14', 'Apple iPhone 15'])
+        self.assertEqual(self.titles('gal'), ['Samsung Galaxy'])
+        self.assertEqual(self.titles('pho', 'categories'), ['Phones'])
+        self.assertEqual(self.titles('xyz'), [])
+
+    def test_catch_up_applies_other_processes_writes(self):
+        # Queryset updates skip the signals, as writes in another worker would
+        Product.objects.filter(title='iPhone case').update(title='iPad case', updated_at=timezone.now())
+        Product.objects.create(title='iPhone 16', description='x', price=1, category=self.category)
+        Category.objects.filter(pk=self.category.pk).update(title='Smartphones', updated_at=timezone.now())
+        self.assertEqual(self.titles('iph'), ['iPhone 14', 'iPhone case', 'Apple iPhone 15'])
+
+        self.index.catch_up()
+        self.assertEqual(self.titles('iph'), ['iPhone 14', 'iPhone 16', 'Apple iPhone 15'])
+        self.assertEqual(self.titles('ipad'), ['iPad case'])
+        self.assertEqual(self.titles('sma', 'categories'), ['Smartphones'])
+        self.assertEqual(self.titles('pho', 'categories'), [])
+
+    def test_deactivated_items_are_removed(self):
+        product = Product.objects.get(title='iPhone 14')
+        product.is_active = False
+        product.save()
+        self.index.update_products([product])
+        self.assertEqual(self.titles('iph'), ['iPhone case', 'Apple iPhone 15'])
+
+        Product.objects.filter(title='iPhone case').update(is_active=False, updated_at=timezone.now())
+        Category.objects.filter(pk=self.category.pk).update(is_active=False, updated_at=timezone.now())
+        self.index.catch_up()
+        self.assertEqual(self.titles('iph'), ['Apple iPhone 15'])
+        self.assertEqual(self.titles('pho', 'categories'), [])
+
+    def test_ranked_prefix_lists_follow_changes(self):
+        # Enough entries for the short prefixes to keep a cached top list
+        Product.objects.bulk_create([
+            Product(title=f'Item {i:03}', slug=f'item-{i:03}', description='x', price=1,
+                    category=self.category, rating=i % 5) for i in range(300)
+        ])
+        self.index.build()
+        self.assertIn('i', self.index._top)
+        best = self.titles('i')[0]
+        Product.objects.filter(title='Item 000').update(rating=9.0, updated_at=timezone.now())
+        self.index.catch_up()
+        self.assertNotEqual(best, 'Item 000')
+        self.assertEqual(self.titles('i')[0], 'Item 000')
+
+
+class ProductSearchEngineTest(TestCase):
+
+    def setUp(self):
+        phones = Category.objects.create(title='Phones')
+        laptops = Category.objects.create(title='Laptops')
+        for title, description, category in (
+            ('Samsung Galaxy S24', 'Android smartphone', phones),
+            ('Apple iPhone 15', 'Smartphone with a great camera', phones),
+            ('Galaxy Book', 'Thin laptop by Samsung', laptops),
+            ('ThinkPad X1', 'Business laptop', laptops),
+        ):
+            Product.objects.create(title=title, description=description, price=1, category=category)
+        # A private index, so no other test sees its state
+        self.index = ProductSearchIndex(sync_interval=3600)
+        patchers = [mock.patch(target, self.index)
+                    for target in ('products.search_index.index', 'products.signals.index')]
+        # Committed saves would rebuild the category tree on a background thread
+        patchers.append(mock.patch.object(category_tree_cache, 'schedule_warm'))
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def slugs(self, q, engine):
+        with override_settings(PRODUCT_SEARCH_ENGINE=engine):
+            response = self.client.get(reverse('product-search'), {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [product['slug'] for product in response.data['results']]
+
+    def test_memory_engine_agrees_with_the_database(self):
+        for q in ('galaxy', 'samsung', 'smartphone', 'laptop', 'thinkpad x1', 'phones', 'gal'):
+            memory = self.slugs(q, 'memory')
+            self.assertTrue(memory, q)
+            self.assertCountEqual(memory, self.slugs(q, 'database'), q)
+        # Title hits outrank description hits in both
+        for engine in ('memory', 'database'):
+            self.assertEqual(self.slugs('samsung', engine)[0], 'samsung-galaxy-s24')
+
+    def test_memory_engine_tolerates_typos(self):
+        self.assertEqual(self.slugs('samsnug galaxy', 'memory')[0], 'samsung-galaxy-s24')
+        self.assertEqual(self.slugs('thinkpda', 'memory'), ['thinkpad-x1'])
+
+    def test_result_limit_applies_after_the_filters(self):
+        # 'galaxy-book' only mentions Samsung in its description, so it
+        # ranks below the phone and used to fall off a one-result cutoff
+        for engine in ('memory', 'database'):
+            with override_settings(PRODUCT_SEARCH_ENGINE=engine, PRODUCT_SEARCH_MAX_RESULTS=1):
+                response = self.client.get(reverse('product-search'),
+                                           {'q': 'samsung', 'category': 'laptops', 'facets': 'category'})
+            self.assertEqual([product['slug'] for product in response.data['results']],
+                             ['galaxy-book'], engine)
+            self.assertEqual([row['count'] for row in response.data['facets']['category']], [1], engine)
+
+    def test_catch_up_after_edits(self):
+        self.assertEqual(self.slugs('pixel', 'memory'), [])
+        # Writes from another process only reach the index through catch-up
+        Product.objects.filter(slug='thinkpad-x1').update(title='Google Pixel 8', updated_at=timezone.now())
+        Category.objects.filter(title='Laptops').update(title='Notebooks', updated_at=timezone.now())
+        self.assertEqual(self.slugs('pixel', 'memory'), [])
+
+        self.index.catch_up()
+        self.assertEqual(self.slugs('pixel', 'memory'), ['thinkpad-x1'])
+        self.assertEqual(self.slugs('thinkpad', 'memory'), [])
+        self.assertCountEqual(self.slugs('notebooks', 'memory'), ['galaxy-book', 'thinkpad-x1'])
+
+        # Saves in this process are applied on commit
+        product = Product.objects.get(slug='apple-iphone-15')
+        product.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.slugs('iphone', 'memory'), [])
+        self.assertEqual(self.slugs('iphone', 'database'), [])
+
+
+class ProductKeysetPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Phones')
+        for i in range(23):
+            # Few distinct values, so every ordering has runs of ties across page boundaries
+            Product.objects.create(title=f'Phone {i}', description='Smartphone', price=100 + i % 3,
+                                   quantity=i % 2, category=category, rating=float(i % 4))
+        Product.objects.filter(title__endswith='0').update(view_count=5)
+        Product.objects.filter(price=101).update(created_at=timezone.now())
+
+    def walk(self, url, link='next'):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            page = [product['id'] for product in response.data['results']]
+            ids = page + ids if link == 'previous' else ids + page
+            url = response.data[link]
+        return ids
+
+    def expected(self, ordering):
+        tie_breaker = '-id' if ordering.startswith('-') else 'id'
+        return [str(pk) for pk in Product.objects.order_by(ordering, tie_breaker).values_list('id', flat=True)]
+
+    def test_every_ordering_covers_each_product_once(self):
+        for ordering in ('price', '-price', 'rating', '-rating', 'created_at', '-created_at',
+                         'view_count', '-view_count'):
+            forward = self.walk(reverse('product-list') + f'?ordering={ordering}&page_size=4')
+            self.assertEqual(len(forward), 23, ordering)
+            self.assertEqual(forward, self.expected(ordering), ordering)
+
+    def test_previous_links_walk_back_over_the_same_rows(self):
+        url = reverse('product-list') + '?ordering=price&page_size=5'
+        while True:
+            response = self.client.get(url)
+            if not response.data['next']:
+                break
+            url = response.data['next']
+        last_page = [product['id'] for product in response.data['results']]
+        self.assertEqual(self.walk(response.data['previous'], 'previous') + last_page,
+                         self.expected('price'))
+
+    def test_filters_and_search_keep_their_pages(self):
+        forward = self.walk(reverse('product-list') + '?ordering=-rating&in_stock=true&page_size=2')
+        expected = [pk for pk in self.expected('-rating')
+                    if Product.objects.get(pk=pk).quantity > 0]
+        self.assertEqual(forward, expected)
+
+        ranked = self.walk(reverse('product-search') + '?q=phone&page_size=4')
+        self.assertEqual(len(ranked), 23)
+        self.assertEqual(len(set(ranked)), 23)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse('product-list'), {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
+
+
+class AllocateUniqueSlugsTest(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(title='Phones')
+        for title in ('Phone', 'Phone', 'Phone case'):
+            Product.objects.create(title=title, description='x', price=1, category=self.category)
+
+    def test_collisions_with_existing_rows_and_within_the_batch(self):
+        self.assertEqual(set(Product.objects.values_list('slug', flat=True)),
+                         {'phone', 'phone-1', 'phone-case'})
+        slugs = allocate_unique_slugs(['Phone', 'Phone', 'Phone 2', 'Phone case', 'Tablet', 'Tablet'],
+                                      Product)
+        self.assertEqual(slugs, ['phone-2', 'phone-3', 'phone-2-1', 'phone-case-1', 'tablet', 'tablet-1'])
+
+    def test_empty_and_long_titles(self):
+        self.assertEqual(allocate_unique_slugs(['!!!', '???'], Product), ['product', 'product-1'])
+        slugs = allocate_unique_slugs(['x' * 300] * 12, Product)
+        self.assertEqual(len(set(slugs)), 12)
+        self.assertTrue(all(len(slug) <= 255 for slug in slugs))
+        self.assertEqual(slugs[11], 'x' * 252 + '-11')
+
+    def test_reserved_slugs_are_skipped(self):
+        slugs = allocate_unique_slugs(['Export', 'Search', 'Search'], Product,
+                                      reserved=Product.RESERVED_SLUGS)
+        self.assertEqual(slugs, ['export-1', 'search-1', 'search-2'])
+
+
+class ProductImporterTest(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(title='Phones')
+        Category.objects.create(title='Hidden', is_active=False)
+        Product.objects.create(title='Phone', description='x', price=1, category=self.category)
+
+    def row(self, title='Phone', **fields):
+        return {'title': title, 'description': 'Smartphone', 'price': '10.5', 'category': 'phones', **fields}
+
+    def test_slugs_stay_unique_across_batches(self):
+        importer = ProductImporter(batch_size=2)
+        self.assertEqual(importer.run([self.row() for _ in range(5)]), 5)
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(sorted(Product.objects.values_list('slug', flat=True)),
+                         ['phone'] + [f'phone-{i}' for i in range(1, 6)])
+        self.assertEqual(Category.objects.get(pk=self.category.pk).product_count, 6)
+
+    def test_invalid_rows_are_reported_with_their_numbers(self):
+        rows = [
+            self.row(),
+            self.row(title=''),
+            self.row(price='abc'),
+            self.row(category='hidden'),
+            self.row(quantity='-1', is_active='maybe'),
+            'not an object',
+            self.row(title='Tablet', category=str(self.category.id), is_active='no'),
+        ]
+        importer = ProductImporter(batch_size=3)
+        self.assertEqual(importer.run(rows), 2)
+        self.assertEqual([number for number, _ in importer.errors], [2, 3, 4, 5, 6])
+        self.assertEqual(importer.errors[2], (4, ['category topilmadi']))
+        self.assertEqual(len(importer.errors[3][1]), 2)
+        self.assertFalse(Product.objects.get(title='Tablet').is_active)
+
+    def test_dry_run_writes_nothing(self):
+        importer = ProductImporter(dry_run=True)
+        self.assertEqual(importer.run([self.row(), self.row(price='')]), 1)
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_slug_taken_during_the_insert_is_reallocated(self):
+        # Another writer inserts "phone-1" between allocation and insert
+        with mock.patch('products.importer.allocate_unique_slugs',
+                        side_effect=[['phone'], allocate_unique_slugs(['Phone'], Product)]):
+            ProductImporter().run([self.row()])
+        self.assertEqual(sorted(Product.objects.values_list('slug', flat=True)), ['phone', 'phone-1'])
+
+    def test_command_reads_ndjson_and_prints_errors(self):
+        lines = [json.dumps(self.row()), '{broken', json.dumps(self.row(price='-5')), '']
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as file:
+            file.write('\n'.join(lines))
+        self.addCleanup(os.unlink, file.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_products', file.name, '--batch-size', '1', stdout=out, stderr=err)
+        self.assertIn('1 ta mahsulot import qilindi, 2 ta qator xato', out.getvalue())
+        self.assertIn('2-qator: JSON xato', err.getvalue())
+        self.assertIn("3-qator: price 0 dan kichik", err.getvalue())
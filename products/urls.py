@@ -1,11 +1,14 @@
 from django.urls import path
 from .views import (ProductListView, ProductDetailView,
                     ProductCreateView, ProductUpdateView,
-                    ProductDeleteView, ProductSearchView)
+                    ProductDeleteView, ProductSearchView,
+                    ProductExportView, ProductAutocompleteView)
 
 urlpatterns = [
     path('', ProductListView.as_view(), name='product-list'),
     path('search/', ProductSearchView.as_view(), name='product-search'),
+    path('export/', ProductExportView.as_view(), name='product-export'),
+    path('autocomplete/', ProductAutocompleteView.as_view(), name='product-autocomplete'),
     path('<slug:slug>/', ProductDetailView.as_view(), name='product-detail'),
     path('create/', ProductCreateView.as_view(), name='product-create'),
     path('<slug:slug>/update/', ProductUpdateView.as_view(), name='product-update'),
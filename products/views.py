@@ -1,23 +1,70 @@
+import uuid
+
 from rest_framework import generics, permissions, filters, status
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from .models import Product
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from categories.models import Category
+from .models import Product, ProductImage
 from .serializers import *
+from . import export, search
+from .autocomplete import MAX_LIMIT, autocomplete_index, max_results
+from .cache import product_detail_cache, product_list_version
+from .counters import view_counter
+from .facets import FacetedListMixin
+from .pagination import ProductSearchPagination
+from core.mixins import ConditionalGetMixin, aggregate_fingerprint
+from core.pagination import KeysetPagination
+from core.serializers import ValuesListMixin
 from core.permissions import IsAdminOrReadOnly
 
 
-class ProductListView(generics.ListAPIView):
+def filter_category_tree(queryset, value):
+    lookup = Q(slug=value)
+    try:
+        lookup |= Q(id=uuid.UUID(value))
+    except ValueError:
+        pass
+    category = Category.objects.filter(lookup, is_active=True).only('id', 'path').first()
+    if category is None:
+        return queryset.none()
+    return queryset.in_category_tree(category)
+
+
+class ProductListView(ConditionalGetMixin, FacetedListMixin, ValuesListMixin, generics.ListAPIView):
     serializer_class = ProductSerializer
+    values_serializer_class = ProductValuesSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'description']
-    ordering_fields = ['price', 'rating', 'created_at']
+    # ?ordering=-view_count lists the most viewed products first
+    ordering_fields = ['price', 'rating', 'created_at', 'view_count']
+    ordering = ['-created_at']
     filterset_fields = ['category', 'is_active']
 
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).select_related('category')
+        return self.get_base_queryset().with_details()
+
+    def get_values_queryset(self):
+        return self.get_base_queryset()
+
+    def get_validators(self):
+        # A version bumped on writes, not an aggregate over the filtered set:
+        # that would cost a full COUNT on every page, and max(updated_at)
+        # stays put when a product leaves the list, so no Last-Modified
+        parts = [product_list_version.version()]
+        # View counts are flushed without touching updated_at
+        if 'view_count' in self.request.query_params.get('ordering', ''):
+            parts.append(product_list_version.version('views'))
+        return ':'.join(map(str, parts)), None
+
+    def get_base_queryset(self):
+        queryset = Product.objects.filter(is_active=True)
 
         # Filter by in_stock
         in_stock = self.request.query_params.get('in_stock')
@@ -36,14 +83,75 @@ class ProductListView(generics.ListAPIView):
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
 
+        # Minimum average rating, e.g. 4 for "4 stars and up"
+        min_rating = self.request.query_params.get('min_rating')
+        if min_rating:
+            try:
+                min_rating = MinRatingField().run_validation(min_rating)
+            except ValidationError as exc:
+                raise ValidationError({'min_rating': exc.detail})
+            queryset = queryset.filter(rating__gte=min_rating)
+
+        # Category and all of its subcategories
+        category_tree = self.request.query_params.get('category_tree')
+        if category_tree:
+            queryset = filter_category_tree(queryset, category_tree)
+
         return queryset
 
 
-class ProductDetailView(generics.RetrieveAPIView):
-    queryset = Product.objects.filter(is_active=True)
-    serializer_class = ProductSerializer
+class ProductDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    queryset = Product.objects.with_details().filter(is_active=True)
+    serializer_class = ProductDetailSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
+    product_id = None
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # Revalidated (304) page loads are views too
+        if response.status_code in (200, 304) and self.product_id is not None:
+            view_counter.increment(self.product_id)
+        return response
+
+    def get_validators(self):
+        # One row: the product and category timestamps plus correlated
+        # max/count subqueries over its images and comments
+        Comment = Product._meta.get_field('comments').related_model
+        related = {
+            'images': ProductImage.objects.filter(product=OuterRef('pk')),
+            'comments': Comment.objects.filter(product=OuterRef('pk')),
+        }
+        annotations = {}
+        for name, queryset in related.items():
+            queryset = queryset.order_by().values('product')
+            annotations[f'{name}_last_modified'] = Subquery(
+                queryset.annotate(value=Max('updated_at')).values('value'))
+            annotations[f'{name}_count'] = Coalesce(Subquery(
+                queryset.annotate(value=Count('id')).values('value')), 0)
+        row = Product.objects.filter(
+            slug=self.kwargs[self.lookup_field], is_active=True
+        ).annotate(**annotations).values(
+            'id', 'updated_at', 'category__updated_at', *annotations
+        ).first()
+        if row is None:
+            return None, None
+        self.product_id = row['id']
+        return aggregate_fingerprint(
+            {'last_modified': row['updated_at'], 'count': 1},
+            {'last_modified': row['category__updated_at'], 'count': 1},
+            *[{'last_modified': row[f'{name}_last_modified'], 'count': row[f'{name}_count']}
+              for name in related],
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        slug = kwargs[self.lookup_field]
+        # No active product behind the slug: skip the cache and let get_object() 404
+        data = product_detail_cache.get(slug, request) if self.product_id is not None else None
+        if data is None:
+            data = dict(self.get_serializer(self.get_object()).data)
+            product_detail_cache.set(slug, request, data)
+        return Response(data)
 
 
 class ProductCreateView(generics.CreateAPIView):
@@ -69,30 +177,42 @@ class ProductDeleteView(generics.DestroyAPIView):
         instance.save()
 
 
-class ProductSearchView(APIView):
+class ProductSearchView(FacetedListMixin, generics.ListAPIView):
+    serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = ProductSearchPagination
+    # Filtering is driven by ProductSearchSerializer below
+    filter_backends = []
+    search_params = None
+    search_hits = None
 
-    def get(self, request):
-        serializer = ProductSearchSerializer(data=request.query_params)
-        serializer.is_valid(raise_exception=True)
+    def get_queryset(self):
+        queryset = self.get_base_queryset().with_details()
+        if self.search_hits is not None:
+            queryset = search.apply_ranking(queryset, self.search_hits)
+        return queryset
 
-        data = serializer.validated_data
-        queryset = Product.objects.filter(is_active=True)
+    def get_search_params(self):
+        # The page and the facets both start from the base queryset
+        if self.search_params is None:
+            serializer = ProductSearchSerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            self.search_params = serializer.validated_data
+        return self.search_params
 
-        # Search query
-        q = data.get('q')
-        if q:
-            queryset = queryset.filter(
-                Q(title__icontains=q) |
-                Q(description__icontains=q) |
-                Q(category__title__icontains=q)
-            )
+    def get_base_queryset(self):
+        data = self.get_search_params()
+        queryset = Product.objects.filter(is_active=True)
 
         # Category filter
         category = data.get('category')
         if category:
             queryset = queryset.filter(category__slug=category)
 
+        category_tree = data.get('category_tree')
+        if category_tree:
+            queryset = filter_category_tree(queryset, category_tree)
+
         # Price filters
         min_price = data.get('min_price')
         max_price = data.get('max_price')
@@ -102,6 +222,10 @@ class ProductSearchView(APIView):
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
 
+        min_rating = data.get('min_rating')
+        if min_rating is not None:
+            queryset = queryset.filter(rating__gte=min_rating)
+
         # In stock filter
         in_stock = data.get('in_stock')
         if in_stock is not None:
@@ -110,5 +234,55 @@ class ProductSearchView(APIView):
             else:
                 queryset = queryset.filter(quantity=0)
 
-        serializer = ProductSerializer(queryset, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        # Search query, last: the engine ranks within the filtered products
+        # so its result limit never drops matches the filters would keep
+        q = data.get('q')
+        if q and search.engine_available():
+            if self.search_hits is None:
+                self.search_hits = search.search_products(q, queryset=queryset)
+            queryset = search.restrict_to_hits(queryset, self.search_hits)
+        elif q:
+            queryset = queryset.filter(
+                Q(title__icontains=q) |
+                Q(description__icontains=q) |
+                Q(category__title__icontains=q)
+            )
+
+        return queryset
+
+
+class ProductExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    # `format` is reserved by DRF for renderer negotiation
+    formats = {
+        'ndjson': (export.stream_ndjson, 'application/x-ndjson'),
+        'csv': (export.stream_csv, 'text/csv'),
+    }
+
+    def get(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in self.formats:
+            return Response({
+                'error': f"export_format quyidagilardan biri bo'lishi kerak: {', '.join(self.formats)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        stream, content_type = self.formats[export_format]
+        response = StreamingHttpResponse(stream(), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="products.{export_format}"'
+        return response
+
+
+class ProductAutocompleteView(APIView):
+    permission_classes = [permissions.AllowAny]
+    # Public and hit on every keystroke, skip JWT decoding
+    authentication_classes = []
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', max_results()))
+        except ValueError:
+            return Response({
+                'error': "limit butun son bo'lishi kerak"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), MAX_LIMIT)
+        return Response(autocomplete_index.suggest(request.query_params.get('q', ''), limit))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations.services import CoPurchaseBuilder
+
+
+class Command(BaseCommand):
+    help = ("Oxirgi ishga tushirishdan keyin yaratilgan buyurtmalardan "
+            "'birga sotib olinadi' tavsiyalarini yangilaydi")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Bir tranzaksiyada qayta ishlanadigan buyurtmalar soni")
+        parser.add_argument('--top-k', type=int, default=None,
+                            help="Har bir mahsulot uchun saqlanadigan tavsiyalar soni")
+        parser.add_argument('--lag', type=int, default=60,
+                            help="Oxirgi N soniyada yaratilgan buyurtmalar keyingi safarga qoldiriladi")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Hamma narsani o'chirib, barcha buyurtmalardan qaytadan hisoblash")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or (options['top_k'] is not None and options['top_k'] < 1):
+            raise CommandError("--batch-size va --top-k musbat bo'lishi kerak")
+        if options['lag'] < 0:
+            raise CommandError("--lag manfiy bo'lishi mumkin emas")
+
+        if options['rebuild']:
+            CoPurchaseBuilder.reset()
+        builder = CoPurchaseBuilder(
+            batch_size=options['batch_size'], top_k=options['top_k'], lag=options['lag'],
+        ).run()
+        self.stdout.write(self.style.SUCCESS(
+            f"{builder.orders} ta buyurtma qayta ishlandi, {builder.pairs} ta juftlik yangilandi, "
+            f"{builder.products} ta mahsulot tavsiyalari yangilandi"
+        ))
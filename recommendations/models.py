@@ -0,0 +1,36 @@
+from django.db import models
+from shared.models import BaseModel
+from products.models import Product
+
+
+class ProductCoPurchase(BaseModel):
+    """How many orders contained both ``product`` and ``other``, stored in both directions."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='co_purchases')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['product', 'other']
+
+    def __str__(self):
+        return f"{self.product_id} + {self.other_id}: {self.count}"
+
+
+class ProductRecommendation(BaseModel):
+    """Top-K co-purchased products, ``[[product_id, count], ...]`` best first."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='recommendation')
+    neighbours = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"Recommendations for {self.product_id}"
+
+
+class RecommendationState(BaseModel):
+    """Keyset watermark of the last order the batch job has processed."""
+    name = models.CharField(max_length=50, unique=True)
+    last_order_created_at = models.DateTimeField(null=True, blank=True)
+    last_order_id = models.UUIDField(null=True, blank=True)
+    orders_processed = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,21 @@
+from rest_framework import serializers
+from products.models import Product
+from shared.thumbnails import thumbnail_urls
+
+
+class RecommendedProductSerializer(serializers.ModelSerializer):
+    main_image = serializers.SerializerMethodField()
+    main_image_thumbnails = serializers.SerializerMethodField()
+    bought_together = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'title', 'slug', 'price', 'rating', 'in_stock',
+                  'main_image', 'main_image_thumbnails', 'bought_together']
+
+    def get_main_image(self, obj):
+        return obj.main_image
+
+    def get_main_image_thumbnails(self, obj):
+        main = obj.get_main_image()
+        return thumbnail_urls(main.image.name, main.thumbnails) if main else None
@@ -0,0 +1,166 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from .models import ProductCoPurchase, ProductRecommendation, RecommendationState
+
+STATE_NAME = 'co_purchase'
+
+
+def get_top_k():
+    return getattr(settings, 'RECOMMENDATIONS_TOP_K', 20)
+
+
+def co_occurrence(order_index, product_index, size):
+    """Count product pairs sharing an order, without a Python loop over baskets.
+
+    ``order_index``/``product_index`` are parallel int arrays, one entry per
+    distinct (order, product). Returns ``(product, other, count)`` arrays
+    holding both directions of every pair.
+    """
+    if not len(order_index):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    order = np.argsort(order_index, kind='stable')
+    orders, products = order_index[order], product_index[order]
+
+    starts = np.flatnonzero(np.r_[True, orders[1:] != orders[:-1]])
+    sizes = np.diff(np.r_[starts, len(orders)])
+    # Every item is paired with each item of its own basket
+    item_sizes = np.repeat(sizes, sizes)
+    item_starts = np.repeat(starts, sizes)
+    left = np.repeat(np.arange(len(orders)), item_sizes)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(item_sizes) - item_sizes, item_sizes)
+    right = np.repeat(item_starts, item_sizes) + offsets
+    keep = left != right
+
+    keys = products[left[keep]] * size + products[right[keep]]
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys // size, keys % size, counts
+
+
+def top_neighbours(products, others, counts, top_k):
+    """Indexes of the ``top_k`` highest counts per product, best first.
+
+    Ties go to the lower ``others`` value.
+    """
+    order = np.lexsort((others, -counts, products))
+    grouped = products[order]
+    starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return order[rank < top_k]
+
+
+class CoPurchaseBuilder:
+    """Folds orders created since the last run into the co-purchase counts.
+
+    Orders are read in ``(created_at, id)`` keyset batches. Every batch is
+    committed together with the watermark, so an interrupted run resumes
+    where it stopped. Only products that appear in the batch get their top-K
+    recomputed.
+    """
+
+    def __init__(self, batch_size=5000, top_k=None, lag=60):
+        self.batch_size = batch_size
+        self.top_k = top_k or get_top_k()
+        # Orders still inside an open transaction may carry an older created_at,
+        # leave the most recent ones for the next run
+        self.lag = lag
+        self.orders = self.products = self.pairs = 0
+
+    def run(self):
+        cutoff = timezone.now() - timedelta(seconds=self.lag)
+        while self._process_batch(cutoff):
+            pass
+        return self
+
+    @staticmethod
+    def reset():
+        with transaction.atomic():
+            ProductRecommendation.objects.all().delete()
+            ProductCoPurchase.objects.all().delete()
+            RecommendationState.objects.filter(name=STATE_NAME).delete()
+
+    def _process_batch(self, cutoff):
+        with transaction.atomic():
+            # The row lock keeps two runs from double counting the same orders
+            state, _ = RecommendationState.objects.select_for_update().get_or_create(name=STATE_NAME)
+            orders = Order.objects.exclude(status='cancelled').filter(created_at__lt=cutoff)
+            if state.last_order_created_at is not None:
+                orders = orders.filter(
+                    Q(created_at__gt=state.last_order_created_at) |
+                    Q(created_at=state.last_order_created_at, id__gt=state.last_order_id)
+                )
+            batch = list(orders.order_by('created_at', 'id').values_list('id', 'created_at')[:self.batch_size])
+            if not batch:
+                return False
+
+            items = OrderItem.objects.filter(
+                order_id__in=[pk for pk, _ in batch], product__isnull=False
+            ).values_list('order_id', 'product_id').distinct()
+            self._apply(list(items))
+
+            state.last_order_id, state.last_order_created_at = batch[-1]
+            state.orders_processed += len(batch)
+            state.save()
+            self.orders += len(batch)
+        return len(batch) == self.batch_size
+
+    def _apply(self, items):
+        product_ids = {}
+        order_ids = {}
+        order_index = np.fromiter((order_ids.setdefault(o, len(order_ids)) for o, _ in items),
+                                  dtype=np.int64, count=len(items))
+        product_index = np.fromiter((product_ids.setdefault(p, len(product_ids)) for _, p in items),
+                                    dtype=np.int64, count=len(items))
+        products, others, counts = co_occurrence(order_index, product_index, len(product_ids))
+        if not len(products):
+            return
+
+        # Existing rows of every touched product, mapped onto the same indexes.
+        # Products first seen there get indexes past the batch ones, so size
+        # the key space only after loading them.
+        batch_ids = list(product_ids)
+        touched = [batch_ids[index] for index in np.unique(products)]
+        existing = list(ProductCoPurchase.objects.filter(product_id__in=touched)
+                        .values_list('product_id', 'other_id', 'count'))
+        old_products = np.fromiter((product_ids.setdefault(p, len(product_ids)) for p, _, _ in existing),
+                                   dtype=np.int64, count=len(existing))
+        old_others = np.fromiter((product_ids.setdefault(o, len(product_ids)) for _, o, _ in existing),
+                                 dtype=np.int64, count=len(existing))
+        old_counts = np.fromiter((c for _, _, c in existing), dtype=np.int64, count=len(existing))
+
+        size = len(product_ids)
+        new_keys = products * size + others
+        keys, inverse = np.unique(np.r_[old_products * size + old_others, new_keys], return_inverse=True)
+        merged = np.bincount(inverse, weights=np.r_[old_counts, counts]).astype(np.int64)
+        merged_products, merged_others = keys // size, keys % size
+
+        ids = list(product_ids)
+        changed = np.flatnonzero(np.isin(keys, new_keys))
+        ProductCoPurchase.objects.bulk_create(
+            [ProductCoPurchase(product_id=ids[merged_products[i]], other_id=ids[merged_others[i]],
+                               count=int(merged[i])) for i in changed],
+            batch_size=1000, update_conflicts=True,
+            unique_fields=['product', 'other'], update_fields=['count', 'updated_at'],
+        )
+
+        # Indexes follow the order ids were met in, which depends on the
+        # batching; break ties on the ids themselves so every run agrees
+        id_rank = np.argsort(np.argsort(np.array([str(pk) for pk in ids])))
+        neighbours = {}
+        for i in top_neighbours(merged_products, id_rank[merged_others], merged, self.top_k):
+            neighbours.setdefault(ids[merged_products[i]], []).append(
+                [str(ids[merged_others[i]]), int(merged[i])])
+        ProductRecommendation.objects.bulk_create(
+            [ProductRecommendation(product_id=pk, neighbours=rows) for pk, rows in neighbours.items()],
+            batch_size=1000, update_conflicts=True,
+            unique_fields=['product'], update_fields=['neighbours', 'updated_at'],
+        )
+        self.products += len(neighbours)
+        self.pairs += len(changed)
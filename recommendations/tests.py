@@ -0,0 +1,84 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from categories.models import Category
+from orders.models import Order, OrderItem
+from products.models import Product
+from users.models import User
+from .models import ProductCoPurchase, ProductRecommendation
+from .services import CoPurchaseBuilder
+
+
+class CoPurchaseRecommendationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Phones')
+        cls.user = User.objects.create(username='buyer', password='x')
+        cls.products = {name: Product.objects.create(title=name, description='x', price=1, category=category)
+                        for name in 'ABCDE'}
+
+    def order(self, names, status='new'):
+        order = Order.objects.create(user=self.user, status=status)
+        for name in names:
+            OrderItem.objects.create(order=order, product=self.products[name], price=1, quantity=1)
+        return order
+
+    def build(self, **kwargs):
+        return CoPurchaseBuilder(lag=0, **kwargs).run()
+
+    def recommended(self, name):
+        response = self.client.get(reverse('product-recommendations',
+                                           kwargs={'slug': self.products[name].slug}))
+        if response.status_code != 200:
+            return response.status_code
+        return [(row['title'], row['bought_together']) for row in response.data]
+
+    def by_id(self, names):
+        return sorted(names, key=lambda name: str(self.products[name].id))
+
+    def snapshot(self):
+        pairs = sorted(ProductCoPurchase.objects.values_list('product_id', 'other_id', 'count'))
+        neighbours = dict(ProductRecommendation.objects.values_list('product_id', 'neighbours'))
+        return pairs, neighbours
+
+    def test_neighbours_of_a_small_order_set(self):
+        for names in ('ABC', 'AB', 'AD', 'BC', 'AE'):
+            self.order(names)
+        self.order('DE', status='cancelled')
+        self.build(top_k=3)
+
+        # C, D and E tie for the last two places, the lower ids win
+        self.assertEqual(self.recommended('A'), [('B', 2)] + [(name, 1) for name in self.by_id('CDE')[:2]])
+        self.assertEqual(self.recommended('B'), [(name, 2) for name in self.by_id('AC')])
+        # Cancelled orders don't count
+        self.assertEqual(self.recommended('E'), [('A', 1)])
+        self.assertEqual(ProductCoPurchase.objects.count(), 10)
+
+    def test_inactive_products_are_left_out(self):
+        for names in ('AB', 'AB', 'AC'):
+            self.order(names)
+        self.build()
+        Product.objects.filter(pk=self.products['B'].pk).update(is_active=False)
+        self.assertEqual(self.recommended('A'), [('C', 1)])
+        self.assertEqual(self.recommended('B'), 404)
+        self.assertEqual(self.recommended('D'), [])
+
+    def test_incremental_runs_match_a_full_rebuild(self):
+        baskets = ['ABC', 'AB', 'CD', 'ABCDE', 'BE', 'DE', 'AE', 'BCD']
+        for names in baskets[:3]:
+            self.order(names)
+        self.build(batch_size=2, top_k=2)
+        for names in baskets[3:]:
+            self.order(names)
+        self.order('AD', status='cancelled')
+        builder = self.build(batch_size=2, top_k=2)
+        self.assertEqual(builder.orders, 5)
+        incremental = self.snapshot()
+
+        CoPurchaseBuilder.reset()
+        self.build(batch_size=100, top_k=2)
+        self.assertEqual(self.snapshot(), incremental)
+        # A second run finds nothing new
+        self.assertEqual(self.build(batch_size=2, top_k=2).orders, 0)
+        self.assertEqual(self.snapshot(), incremental)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ProductRecommendationsView
+
+urlpatterns = [
+    path('products/<slug:slug>/', ProductRecommendationsView.as_view(), name='product-recommendations'),
+]
@@ -0,0 +1,34 @@
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from products.models import Product, ProductImage
+from .models import ProductRecommendation
+from .serializers import RecommendedProductSerializer
+
+
+class ProductRecommendationsView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, slug):
+        # One lookup through the unique slug and product indexes
+        neighbours = ProductRecommendation.objects.filter(
+            product__slug=slug, product__is_active=True
+        ).values_list('neighbours', flat=True).first()
+        if neighbours is None:
+            get_object_or_404(Product, slug=slug, is_active=True)
+            return Response([])
+
+        counts = {pk: count for pk, count in neighbours}
+        positions = {pk: position for position, (pk, _) in enumerate(neighbours)}
+        products = Product.objects.filter(id__in=counts, is_active=True).prefetch_related(
+            Prefetch('images', queryset=ProductImage.objects.filter(is_main=True))
+        )
+        # Stored best first, ties included
+        products = sorted(products, key=lambda product: positions[str(product.id)])
+        for product in products:
+            product.bought_together = counts[str(product.id)]
+        serializer = RecommendedProductSerializer(products, many=True, context={'request': request})
+        return Response(serializer.data)
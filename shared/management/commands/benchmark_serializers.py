@@ -0,0 +1,126 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from categories.models import Category
+from comments.models import Comment
+from comments.serializers import CommentSerializer, CommentValuesSerializer
+from orders.models import Order, OrderItem
+from orders.serializers import OrderSerializer, OrderValuesSerializer
+from products.models import Product, ProductImage
+from products.serializers import ProductSerializer, ProductValuesSerializer
+from users.models import User
+
+DEFAULT_SIZES = [20, 100, 1000]
+
+
+def create_fixtures(rows):
+    """Vaqtinchalik ma'lumotlar: har bir endpoint uchun ``rows`` ta qator."""
+    category = Category.objects.create(title='Benchmark')
+    products = Product.objects.bulk_create([
+        Product(title=f'Benchmark {i}', slug=f'benchmark-serializers-{i}',
+                description='Benchmark mahsulot ' * 10, price=10 + i, quantity=i % 3,
+                category=category)
+        for i in range(rows)
+    ])
+    ProductImage.objects.bulk_create([
+        ProductImage(product=product, image=f'products/benchmark-{i}-{n}.jpg', is_main=not n)
+        for i, product in enumerate(products) for n in range(2)
+    ])
+    users = User.objects.bulk_create([
+        User(username=f'benchmark-serializers-{i}', email=f'benchmark{i}@example.com')
+        for i in range(rows)
+    ])
+    Comment.objects.bulk_create([
+        Comment(user=user, product=products[0], text='Yaxshi', rating=i % 5 + 1)
+        for i, user in enumerate(users)
+    ])
+    orders = Order.objects.bulk_create([
+        Order(user=users[0], total_price=30, status='new') for _ in range(rows)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=products[(i + n) % rows], price=10, quantity=n + 1)
+        for i, order in enumerate(orders) for n in range(2)
+    ])
+    return products[0], users[0]
+
+
+def benchmark_cases(product, user):
+    products = Product.objects.filter(is_active=True).order_by('-created_at', '-id')
+    comments = Comment.objects.filter(product=product, is_active=True)
+    orders = Order.objects.filter(user=user)
+    return [
+        ('product-list', ProductSerializer, ProductValuesSerializer,
+         products.with_details(), products),
+        ('product-comments', CommentSerializer, CommentValuesSerializer,
+         comments.select_related('user', 'product'), comments),
+        ('order-list', OrderSerializer, OrderValuesSerializer,
+         orders.select_related('user').prefetch_related('items__product'), orders),
+    ]
+
+
+def allowed_host():
+    # build_absolute_uri() validates the host; the factory's 'testserver'
+    # fails it, 'localhost' passes the DEBUG defaults when the list is empty
+    hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+    return hosts[0] if hosts else 'localhost'
+
+
+class Command(BaseCommand):
+    help = ("List endpointlar uchun ModelSerializer va values() serializatsiyasini solishtiradi. "
+            "Ma'lumotlar tranzaksiya ichida yaratilib, oxirida bekor qilinadi")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                            help="Qatorlar soni (default: 20 100 1000)")
+        parser.add_argument('--repeat', type=int, default=5, help="Har bir o'lchov necha marta")
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        repeat = max(1, options['repeat'])
+        request = APIRequestFactory().get('/', SERVER_NAME=allowed_host())
+        renderer = JSONRenderer()
+
+        with transaction.atomic():
+            product, user = create_fixtures(sizes[-1])
+            request.user = user
+            context = {'request': request}
+
+            self.stdout.write(f"{'endpoint':<18}{'qator':>7}{'model, ms':>12}{'values, ms':>12}{'tezlik':>9}")
+            for name, serializer_class, values_class, model_queryset, values_queryset in \
+                    benchmark_cases(product, user):
+                for size in sizes:
+                    def model_path():
+                        return serializer_class(model_queryset[:size], many=True, context=context).data
+
+                    def values_path():
+                        serializer = values_class(context)
+                        return serializer.serialize(serializer.get_queryset(values_queryset)[:size])
+
+                    if renderer.render(model_path()) != renderer.render(values_path()):
+                        raise CommandError(f"{name} ({size}): JSON natijalar bir xil emas")
+
+                    model_ms = self.measure(model_path, repeat)
+                    values_ms = self.measure(values_path, repeat)
+                    self.stdout.write(
+                        f"{name:<18}{size:>7}{model_ms:>12.1f}{values_ms:>12.1f}"
+                        f"{model_ms / values_ms:>8.1f}x"
+                    )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Natijalar bir xil, vaqtinchalik ma'lumotlar o'chirildi"))
+
+    @staticmethod
+    def measure(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,118 @@
+import re
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from rest_framework.test import APIRequestFactory
+
+from categories.models import Category
+from categories.views import CategoryListView
+from comments.views import AllCommentsListView, ProductCommentsListView
+from core.pagination import KeysetPagination
+from orders.views import OrderListView
+from products.models import Product
+from products.views import ProductListView, ProductSearchView
+from users.models import User
+
+# SQLite: "SCAN table" without an index, or a temp b-tree sort.
+# PostgreSQL: "Seq Scan on table" or an explicit Sort node.
+SCAN_PATTERNS = {
+    'sqlite': [
+        (re.compile(r'\bSCAN \w+\b(?! USING)'), 'full scan'),
+        (re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY)'), 'sort in memory'),
+    ],
+    'postgresql': [
+        (re.compile(r'Seq Scan on (\w+)'), 'full scan'),
+        (re.compile(r'->\s+Sort\b|^Sort\b'), 'sort in memory'),
+    ],
+}
+
+
+def list_view_checks():
+    category = Category.objects.filter(is_active=True).values_list('id', flat=True).first()
+    product = Product.objects.filter(is_active=True).values_list('slug', flat=True).first()
+    # An unsaved user is enough for the per-user filters
+    user = User(id=uuid.uuid4(), is_staff=False)
+
+    checks = [
+        ('product-list', ProductListView, {}, {}, None),
+        ('product-list ordering=price', ProductListView, {'ordering': 'price'}, {}, None),
+        ('product-list ordering=-rating', ProductListView, {'ordering': '-rating'}, {}, None),
+        ('product-list in_stock', ProductListView, {'in_stock': 'true'}, {}, None),
+        ('product-search price range', ProductSearchView,
+         {'min_price': '10', 'max_price': '1000'}, {}, None),
+        ('category-list', CategoryListView, {}, {}, None),
+        ('all-comments', AllCommentsListView, {}, {}, user),
+        ('order-list', OrderListView, {}, {}, user),
+    ]
+    if category:
+        checks.append(('product-list category', ProductListView, {'category': category}, {}, None))
+    if product:
+        checks.append(('product-comments', ProductCommentsListView, {}, {'slug': product}, None))
+    return checks
+
+
+def build_queryset(view_class, params, kwargs, user):
+    factory = APIRequestFactory()
+    view = view_class()
+    request = factory.get('/', params)
+    view.setup(request, **kwargs)
+    view.request = view.initialize_request(request)
+    if user is not None:
+        view.request.user = user
+    view.format_kwarg = None
+
+    queryset = view.filter_queryset(view.get_queryset())
+    paginator = view.paginator
+    if isinstance(paginator, KeysetPagination):
+        ordering = paginator.get_keyset_ordering(view.request, queryset, view)
+        return queryset.order_by(*ordering)[:paginator.page_size]
+    if paginator is not None:
+        return queryset[:paginator.get_page_size(view.request)]
+    return queryset
+
+
+class Command(BaseCommand):
+    help = "List/search view querylarini EXPLAIN qilib, full scan va xotiradagi sortlarni ko'rsatadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help="To'liq planni chiqarish")
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help="Full scan topilsa xato kodi bilan chiqish")
+
+    def handle(self, *args, **options):
+        patterns = SCAN_PATTERNS.get(connection.vendor)
+        if patterns is None:
+            raise CommandError(f"{connection.vendor} uchun plan tahlili qo'llab-quvvatlanmaydi")
+
+        flagged = 0
+        for name, view_class, params, kwargs, user in list_view_checks():
+            try:
+                plan = build_queryset(view_class, params, kwargs, user).explain()
+            except DatabaseError as e:
+                # NotSupportedError included, e.g. EXPLAIN on a backend without it
+                self.stdout.write(self.style.WARNING(f"{name}: o'tkazib yuborildi ({e})"))
+                continue
+
+            issues = []
+            for line in plan.splitlines():
+                for pattern, label in patterns:
+                    match = pattern.search(line)
+                    if match:
+                        issues.append(f"{label}: {match.group(0).strip()}")
+
+            if issues:
+                flagged += 1
+                self.stdout.write(self.style.ERROR(f"{name}: {', '.join(issues)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: OK"))
+            if options['verbose_plans'] or issues:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+        self.stdout.write(
+            "Eslatma: kichik jadvallarda planner indeks o'rniga full scan tanlashi mumkin, "
+            "natijani real hajmdagi ma'lumotda tekshiring."
+        )
+        if flagged and options['fail_on_scan']:
+            raise CommandError(f"{flagged} ta query full scan yoki xotiradagi sort ishlatadi")
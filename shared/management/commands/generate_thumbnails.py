@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from products.models import ProductImage
+from shared.thumbnails import generate_thumbnails
+from users.models import User
+
+
+# Models that keep the generated thumbnails of an image field
+RECORDERS = {'products': ProductImage.record_thumbnails, 'users': User.record_thumbnails}
+
+
+def _generate(args):
+    source, name, overwrite = args
+    try:
+        thumbnails, written = generate_thumbnails(name, overwrite=overwrite)
+        return source, name, thumbnails, len(written), None
+    except Exception as error:
+        return source, name, None, 0, str(error) or error.__class__.__name__
+
+
+def image_names(sources):
+    """``(source, name)`` of every stored image."""
+    if 'products' in sources:
+        for name in ProductImage.objects.exclude(image='').values_list(
+                'image', flat=True).distinct().iterator(chunk_size=2000):
+            yield 'products', name
+    if 'users' in sources:
+        for name in User.objects.exclude(photo__isnull=True).exclude(photo='').values_list(
+                'photo', flat=True).distinct().iterator(chunk_size=2000):
+            yield 'users', name
+
+
+class Command(BaseCommand):
+    help = "Mavjud mahsulot rasmlari va foydalanuvchi rasmlari uchun thumbnail yaratadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Parallel jarayonlar soni")
+        parser.add_argument('--only', choices=['products', 'users'],
+                            help="Faqat bitta turdagi rasmlar")
+        parser.add_argument('--overwrite', action='store_true',
+                            help="Mavjud thumbnaillarni qayta yaratish")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers musbat bo'lishi kerak")
+        sources = [options['only']] if options['only'] else ['products', 'users']
+        tasks = ((source, name, options['overwrite']) for source, name in image_names(sources))
+
+        images = created = failed = 0
+        # Resizing is CPU bound, so use processes; workers only touch storage,
+        # the results are recorded on the rows from here
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            for source, name, thumbnails, count, error in pool.map(_generate, tasks, chunksize=16):
+                images += 1
+                created += count
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                else:
+                    RECORDERS[source](name, thumbnails)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{images} ta rasm ko'rildi, {created} ta thumbnail yaratildi, {failed} ta xato"
+        ))
@@ -1,3 +1,120 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import NotSupportedError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from categories.cache import category_tree_cache
+from categories.models import Category
+from products.models import Product, ProductImage
+from . import thumbnails
+
+
+class ThumbnailTest(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, THUMBNAIL_SIZES={'small': 40, 'large': 120})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (300, 150), 'red').save(buffer, format='JPEG')
+        self.name = default_storage.save('products/photo.jpg', ContentFile(buffer.getvalue()))
+        self.originals = {'small': '/media/products/photo.jpg', 'large': '/media/products/photo.jpg'}
+
+    def test_urls_come_from_the_recorded_thumbnails(self):
+        self.assertEqual(thumbnails.thumbnail_urls(self.name), self.originals)
+
+        record, written = thumbnails.generate_thumbnails(self.name)
+        self.assertEqual(sorted(written), ['products/photo.large.webp', 'products/photo.small.webp'])
+        with mock.patch.object(default_storage, 'exists') as exists:
+            self.assertEqual(thumbnails.thumbnail_urls(self.name, record), {
+                'small': '/media/products/photo.small.webp',
+                'large': '/media/products/photo.large.webp',
+            })
+            # A record made from another file is ignored
+            self.assertEqual(thumbnails.thumbnail_urls('products/photo.jpg', {'source': 'products/old.jpg',
+                                                                              'files': record['files']}),
+                             self.originals)
+        exists.assert_not_called()
+        with default_storage.open('products/photo.small.webp') as file:
+            self.assertEqual(Image.open(file).size, (40, 20))
+
+    def test_existing_thumbnails_are_not_regenerated(self):
+        record, written = thumbnails.generate_thumbnails(self.name)
+        self.assertEqual(len(written), 2)
+        self.assertEqual(thumbnails.generate_thumbnails(self.name), (record, []))
+        self.assertEqual(len(thumbnails.generate_thumbnails(self.name, overwrite=True)[1]), 2)
+
+    def test_background_generation_hands_over_the_record(self):
+        record = mock.Mock()
+        thumbnails.get_executor().submit(thumbnails._generate_in_background, self.name, record).result()
+        record.assert_called_once_with(self.name, thumbnails.generate_thumbnails(self.name)[0])
+
+    @mock.patch('products.views.view_counter')
+    @mock.patch('products.signals.schedule_thumbnails')
+    def test_recorded_thumbnails_refresh_cached_products(self, schedule_thumbnails, view_counter):
+        patcher = mock.patch.object(category_tree_cache, 'schedule_warm')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        category = Category.objects.create(title='Phones')
+        product = Product.objects.create(title='Phone', description='x', price=1, category=category)
+        ProductImage.objects.create(product=product, image=self.name, is_main=True)
+        url = reverse('product-detail', kwargs={'slug': product.slug})
+        detail = self.client.get(url)
+        list_etag = self.client.get(reverse('product-list'))['ETag']
+        self.assertEqual(detail.data['main_image_thumbnails'], self.originals)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.record_thumbnails(self.name, thumbnails.generate_thumbnails(self.name)[0])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=detail['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['main_image_thumbnails']['small'], '/media/products/photo.small.webp')
+        self.assertNotEqual(self.client.get(reverse('product-list'))['ETag'], list_etag)
+        self.assertGreater(Product.objects.get().updated_at, product.updated_at)
+
+
+class ExplainQueriesCommandTest(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(title='Phones')
+        Product.objects.create(title='Phone', description='x', price=1, category=category)
+
+    def explain(self):
+        out = io.StringIO()
+        call_command('explain_queries', '--verbose-plans', stdout=out)
+        return out.getvalue()
+
+    def test_every_view_is_explained(self):
+        output = self.explain()
+        for name in ('product-list ordering=price', 'product-list category', 'product-search price range',
+                     'category-list', 'all-comments', 'order-list', 'product-comments'):
+            self.assertIn(f'{name}: ', output)
+        self.assertNotIn("o'tkazib yuborildi", output)
+
+    def test_database_errors_skip_the_view(self):
+        target = 'shared.management.commands.explain_queries.build_queryset'
+        with mock.patch(target, side_effect=NotSupportedError('no EXPLAIN')):
+            self.assertIn("product-list: o'tkazib yuborildi (no EXPLAIN)", self.explain())
+        # Anything else is a bug in the command and must surface
+        with mock.patch(target, side_effect=AttributeError('view')):
+            with self.assertRaises(AttributeError):
+                self.explain()
+
+
+class BenchmarkSerializersCommandTest(TestCase):
+
+    def test_outputs_match_and_fixtures_are_rolled_back(self):
+        out = io.StringIO()
+        call_command('benchmark_serializers', '--sizes', '3', '--repeat', '1', stdout=out)
+        self.assertIn('order-list', out.getvalue())
+        self.assertFalse(Product.objects.exists())
@@ -0,0 +1,131 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = {'small': 160, 'medium': 480, 'large': 960}
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_sizes():
+    """``{name: longest edge in px}``"""
+    return getattr(settings, 'THUMBNAIL_SIZES', DEFAULT_SIZES)
+
+
+def get_format():
+    return getattr(settings, 'THUMBNAIL_FORMAT', 'WEBP').upper()
+
+
+def thumbnail_name(name, size):
+    # products/abc.jpg -> products/abc.small.webp, next to the original
+    root, _ = os.path.splitext(name)
+    return f'{root}.{size}.{EXTENSIONS[get_format()]}'
+
+
+def thumbnail_urls(name, thumbnails=None, request=None):
+    """``{size: url}`` for ``name``.
+
+    ``thumbnails`` is what ``generate_thumbnails`` returned, stored on the
+    model next to the image. Sizes it doesn't list, or a record made from
+    another file, point at the original; storage itself is never probed.
+    """
+    if not name:
+        return None
+    files = thumbnails['files'] if thumbnails and thumbnails.get('source') == name else {}
+    urls = {}
+    for size in get_sizes():
+        url = default_storage.url(files.get(size, name))
+        urls[size] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def _save_options(image_format):
+    quality = getattr(settings, 'THUMBNAIL_QUALITY', 80)
+    if image_format == 'WEBP':
+        return {'quality': quality, 'method': 4}
+    if image_format == 'JPEG':
+        return {'quality': quality, 'optimize': True, 'progressive': True}
+    return {'optimize': True}
+
+
+def generate_thumbnails(name, storage=None, overwrite=False):
+    """Write the missing thumbnails of ``name``.
+
+    Returns ``(thumbnails, written)``: ``{'source': name, 'files': {size:
+    stored name}}`` covering every size now on storage, and the names this
+    call wrote.
+    """
+    storage = storage or default_storage
+    sizes = get_sizes()
+    files = {size: thumbnail_name(name, size) for size in sizes}
+    targets = [(sizes[size], size) for size, target in files.items()
+               if overwrite or not storage.exists(target)]
+    if not targets:
+        return {'source': name, 'files': files}, []
+
+    image_format = get_format()
+    largest = max(edge for edge, _ in targets)
+    with storage.open(name, 'rb') as file:
+        image = Image.open(file)
+        # JPEGs can be decoded straight at 1/2..1/8 scale, much cheaper than a full decode
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    mode = 'RGBA' if has_alpha and image_format != 'JPEG' else 'RGB'
+    if image.mode != mode:
+        image = image.convert(mode)
+
+    written = []
+    # Largest first, so every smaller size is resized from the previous one
+    for edge, size in sorted(targets, reverse=True):
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, **_save_options(image_format))
+        if storage.exists(files[size]):
+            storage.delete(files[size])
+        files[size] = storage.save(files[size], ContentFile(buffer.getvalue()))
+        written.append(files[size])
+    return {'source': name, 'files': files}, written
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                    thread_name_prefix='thumbnails',
+                )
+    return _executor
+
+
+def _generate_in_background(name, record):
+    try:
+        thumbnails, _ = generate_thumbnails(name)
+        record(name, thumbnails)
+    except Exception:
+        logger.exception('Thumbnail generation failed for %s', name)
+    finally:
+        connection.close()
+
+
+def schedule_thumbnails(name, record):
+    """Generate thumbnails in the worker pool once the current transaction
+    commits, then hand them to ``record(name, thumbnails)`` for storing."""
+    if name:
+        transaction.on_commit(lambda: get_executor().submit(_generate_in_background, name, record))
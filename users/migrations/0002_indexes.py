@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userconfirmation',
+            index=models.Index(fields=['user', 'confirmed', 'expiration_time'], name='userconfirmation_lookup_idx'),
+        ),
+    ]
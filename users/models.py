@@ -38,10 +38,19 @@ class User(AbstractUser, BaseModel):
     photo = models.ImageField(upload_to='users_photo/', null=True,
                               blank=True,
                               validators=[FileExtensionValidator(allowed_extensions=['png', 'jpg', 'jpeg'])])
+    # Generated thumbnails of `photo`, see shared.thumbnails.generate_thumbnails
+    photo_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.username
 
+    @classmethod
+    def record_thumbnails(cls, name, thumbnails):
+        # save() so the comment caches showing this user are dropped
+        for user in cls.objects.filter(photo=name):
+            user.photo_thumbnails = thumbnails
+            user.save(update_fields=['photo_thumbnails', 'updated_at'])
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
@@ -110,6 +119,12 @@ class UserConfirmation(BaseModel):
     expiration_time = models.DateTimeField(null=True, blank=True)
     confirmed = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'confirmed', 'expiration_time'],
+                         name='userconfirmation_lookup_idx'),
+        ]
+
     def __str__(self):
         return str(self.user.__str__())
 
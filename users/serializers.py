@@ -8,6 +8,8 @@ from rest_framework.exceptions import ValidationError, NotFound, PermissionDenie
 from rest_framework.generics import get_object_or_404
 from rest_framework_simplejwt.tokens import AccessToken
 
+from core.serializers import ValuesSerializer
+from shared.thumbnails import thumbnail_urls
 from .models import User, VIA_EMAIL, VIA_PHONE, CODE_VERIFIED, DONE, CLIENT, NEW, UserConfirmation
 from shared.utility import email_or_phone, user_check_type, send_email
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
@@ -235,6 +237,8 @@ class UserChangeInfoSerializer(serializers.ModelSerializer):
 class UserProfileSerializer(serializers.ModelSerializer):
     username = serializers.SerializerMethodField()
     message = serializers.SerializerMethodField()
+    photo = serializers.ImageField(read_only=True)
+    photo_thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -248,20 +252,52 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'message',
             'auth_status',
             'auth_type',
+            'photo',
+            'photo_thumbnails',
         )
 
     def get_username(self, obj):
-        # Agar CLIENT bo'lsa username ko'rsatilsin, aks holda None
-        if obj.auth_status == CLIENT:
-            return obj.username
-        return None
+        return profile_username(obj.auth_status, obj.username)
 
     def get_message(self, obj):
-        if obj.auth_status == CLIENT:
-            return "Foydalanuvchi to'liq ro'yxatdan o'tgan"
-        elif obj.auth_status == DONE:
-            return "Foydalanuvchi hali CLIENT emas, lekin to'liq ro'yxatdan o'tgan"
-        return "Foydalanuvchi hali to'liq ro'yxatdan o'tmagan"
+        return profile_message(obj.auth_status)
+
+    def get_photo_thumbnails(self, obj):
+        return thumbnail_urls(obj.photo.name, obj.photo_thumbnails, self.context.get('request'))
+
+
+def profile_username(auth_status, username):
+    # Agar CLIENT bo'lsa username ko'rsatilsin, aks holda None
+    if auth_status == CLIENT:
+        return username
+    return None
+
+
+def profile_message(auth_status):
+    if auth_status == CLIENT:
+        return "Foydalanuvchi to'liq ro'yxatdan o'tgan"
+    elif auth_status == DONE:
+        return "Foydalanuvchi hali CLIENT emas, lekin to'liq ro'yxatdan o'tgan"
+    return "Foydalanuvchi hali to'liq ro'yxatdan o'tmagan"
+
+
+class UserProfileValuesSerializer(ValuesSerializer):
+    serializer_class = UserProfileSerializer
+    columns = ['id', 'first_name', 'last_name', 'email', 'phone_number',
+               'username', 'auth_status', 'auth_type', 'photo', 'photo_thumbnails']
+    computed = ('username', 'message', 'photo', 'photo_thumbnails')
+
+    def get_username(self, row):
+        return profile_username(self.value(row, 'auth_status'), self.value(row, 'username'))
+
+    def get_message(self, row):
+        return profile_message(self.value(row, 'auth_status'))
+
+    def get_photo(self, row):
+        return self.file_url(self.value(row, 'photo'))
+
+    def get_photo_thumbnails(self, row):
+        return thumbnail_urls(self.value(row, 'photo'), self.value(row, 'photo_thumbnails'), self.request)
 
 
 class UserPhotoSerializer(serializers.Serializer):
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from shared.thumbnails import schedule_thumbnails
+from .models import User
+
+
+def _touches_photo(update_fields):
+    # Logins only touch last_login, don't queue work for them
+    return update_fields is None or 'photo' in update_fields
+
+
+@receiver(pre_save, sender=User)
+def remember_stored_photo(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or not _touches_photo(update_fields):
+        return
+    instance._stored_photo = User.objects.filter(pk=instance.pk).values_list('photo', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def generate_photo_thumbnails(sender, instance, raw=False, update_fields=None, **kwargs):
+    stored_photo = instance.__dict__.pop('_stored_photo', None)
+    if raw or not _touches_photo(update_fields):
+        return
+    # Profile edits save the whole row, only a new photo needs thumbnails
+    if instance.photo and instance.photo.name != stored_photo:
+        schedule_thumbnails(instance.photo.name, User.record_thumbnails)
@@ -1,3 +1,29 @@
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from .models import User
+
+
+@mock.patch('users.signals.schedule_thumbnails')
+class UserPhotoThumbnailTest(TestCase):
+
+    def test_only_a_new_photo_is_scheduled(self, schedule_thumbnails):
+        user = User.objects.create(username='buyer', password='x', photo='users_photo/a.jpg')
+        schedule_thumbnails.assert_called_once_with('users_photo/a.jpg', User.record_thumbnails)
+        schedule_thumbnails.reset_mock()
+
+        user.first_name = 'Ali'
+        user.save()
+        user.save(update_fields=['last_login'])
+        User.objects.get(pk=user.pk).save()
+        schedule_thumbnails.assert_not_called()
+
+        user.photo = 'users_photo/b.jpg'
+        user.save()
+        schedule_thumbnails.assert_called_once_with('users_photo/b.jpg', User.record_thumbnails)
+
+    def test_users_without_a_photo_schedule_nothing(self, schedule_thumbnails):
+        user = User.objects.create(username='buyer', password='x')
+        user.save()
+        schedule_thumbnails.assert_not_called()